@@ -0,0 +1,277 @@
+"""
+automaton.py
+
+Обобщение задачи о симпатичных узорах: k цветов и запрет одноцветных
+прямоугольников a×b (a строк, b столбцов). Правило компилируется в автомат
+переходов между строками, автомат минимизируется, а подсчёт выполняется
+теми же построчной динамикой и возведением матрицы в степень, что и в main.py.
+"""
+
+from itertools import permutations, product
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from lab1.main import Matrix, normalize_size, vec_mat_pow, weighted_dp_step
+
+# Состояние окна ширины b: -1, если в последней строке окно не одноцветно, иначе код
+# colour · a + run, где run – сколько последних строк подряд (1..a-1) окно одноцветно цветом colour.
+WindowState = int
+# Состояние автомата до минимизации – состояния всех окон строки.
+RawState = Tuple[WindowState, ...]
+# Сигнатура строки: для каждого окна – его цвет, если окно одноцветно, иначе -1.
+Signature = Tuple[int, ...]
+# Префиксное дерево сигнатур: children[v] – пары (цвет окна, ребенок), weights[v] – число строк
+# с сигнатурой, которая заканчивается в листе v. Корень – узел 0.
+SignatureTrie = Tuple[List[List[Tuple[int, int]]], List[int]]
+
+# Доступные способы подсчёта по скомпилированному автомату.
+AUTOMATON_STRATEGIES = ("dp", "matrix")
+
+
+class ColouringRule(NamedTuple):
+    """Правило раскраски: colours цветов, запрещён одноцветный прямоугольник block_height×block_width."""
+    colours: int = 2
+    block_height: int = 2
+    block_width: int = 2
+
+
+class RowAutomaton(NamedTuple):
+    """
+    Минимизированный автомат переходов между строками.
+
+    start – номер состояния до первой строки;
+    incoming[b] – пары (a, кратность): сколькими строками можно перейти из a в b;
+    raw_states – число достижимых состояний до минимизации.
+    """
+    start: int
+    incoming: List[List[Tuple[int, int]]]
+    raw_states: int
+
+    @property
+    def size(self) -> int:
+        return len(self.incoming)
+
+
+def row_signatures(rule: ColouringRule, cols: int) -> Dict[Signature, int]:
+    """
+    Группирует все colours^cols раскрасок строки по сигнатурам: дальнейшие ограничения
+    зависят только от того, какие окна ширины block_width одноцветны и каким цветом.
+
+    Параметры:
+      rule (ColouringRule): Правило раскраски.
+      cols (int): Ширина двора.
+
+    Возвращает:
+      Dict[Signature, int]: Сигнатура -> число строк с такой сигнатурой.
+    """
+    windows: int = max(0, cols - rule.block_width + 1)
+    signatures: Dict[Signature, int] = {}
+    for row in product(range(rule.colours), repeat=cols):
+        signature = tuple(
+            row[j] if row[j:j + rule.block_width].count(row[j]) == rule.block_width else -1
+            for j in range(windows)
+        )
+        signatures[signature] = signatures.get(signature, 0) + 1
+    return signatures
+
+
+def signature_trie(signatures: Dict[Signature, int]) -> SignatureTrie:
+    """Складывает сигнатуры в префиксное дерево: общие префиксы проверяются один раз."""
+    children: List[List[Tuple[int, int]]] = [[]]
+    weights: List[int] = [0]
+    for signature, count in signatures.items():
+        node = 0
+        for colour in signature:
+            child = next((c for window_colour, c in children[node] if window_colour == colour), -1)
+            if child < 0:
+                child = len(children)
+                children.append([])
+                weights.append(0)
+                children[node].append((colour, child))
+            node = child
+        weights[node] += count
+    return children, weights
+
+
+def _successors(state: RawState, trie: SignatureTrie, block_height: int) -> Dict[RawState, int]:
+    """
+    Все переходы из состояния: следующее состояние -> число строк. Сигнатуры перебираются
+    по дереву окно за окном, и поддерево отбрасывается целиком, как только окно оказывается
+    одноцветным block_height строк подряд.
+    """
+    children, weights = trie
+    windows: int = len(state)
+    targets: Dict[RawState, int] = {}
+    prefix: List[WindowState] = []
+
+    def walk(node: int, j: int) -> None:
+        if j == windows:
+            target = tuple(prefix)
+            targets[target] = targets.get(target, 0) + weights[node]
+            return
+        window = state[j]
+        for colour, child in children[node]:
+            if colour < 0:
+                prefix.append(-1)
+            else:
+                run = window % block_height + 1 if window >= 0 and window // block_height == colour else 1
+                if run >= block_height:
+                    continue  # Окно одноцветно block_height строк подряд.
+                prefix.append(colour * block_height + run)
+            walk(child, j + 1)
+            prefix.pop()
+
+    walk(0, 0)
+    return targets
+
+
+def _symmetries(rule: ColouringRule) -> List[Tuple[List[int], bool]]:
+    """
+    Симметрии правила: перестановка цветов (как таблица кодов окон) и отражение строки.
+    Они переводят допустимые раскраски в допустимые, поэтому у состояний одной орбиты
+    одинаковое число продолжений.
+    """
+    codes = range(rule.colours * rule.block_height)
+    return [([perm[code // rule.block_height] * rule.block_height + code % rule.block_height for code in codes],
+             reflect)
+            for perm in permutations(range(rule.colours)) for reflect in (False, True)]
+
+
+def compile_rule(rule: ColouringRule, cols: int) -> RowAutomaton:
+    """
+    Компилирует правило в минимальный автомат переходов между строками ширины cols.
+
+    Состояния (состояния окон, а не сами строки) склеиваются ещё при обходе: каждое новое
+    состояние заменяется каноническим представителем своей орбиты относительно перестановок
+    цветов и отражения, так что переходы строятся только из представителей – в 2·k! раз
+    меньше работы. Переходы из состояния перебираются по префиксному дереву сигнатур
+    с отсечением запрещённых поддеревьев. Затем оставшиеся состояния с одинаковым числом
+    продолжений склеиваются последовательным разбиением на классы эквивалентности
+    (как в алгоритме Мура, но по суммарным весам переходов).
+
+    Параметры:
+      rule (ColouringRule): Правило раскраски.
+      cols (int): Ширина двора.
+
+    Возвращает:
+      RowAutomaton: Минимизированный автомат.
+
+    Генерирует:
+      ValueError: Если параметры правила не являются положительными целыми числами.
+    """
+    if min(rule) < 1 or cols < 1:
+        raise ValueError("Rule parameters and width must be positive integers")
+
+    trie = signature_trie(row_signatures(rule, cols))
+    symmetries = _symmetries(rule)
+    start_state: RawState = (-1,) * max(0, cols - rule.block_width + 1)
+
+    # --- Достижимые состояния (обход в ширину по представителям орбит) ---
+    index: Dict[RawState, int] = {start_state: 0}  # Представитель орбиты -> номер состояния.
+    canonical: Dict[RawState, int] = {start_state: 0}  # Любое встреченное состояние -> номер.
+    states: List[RawState] = [start_state]
+    raw_states: int = 1  # Стартовое состояние неподвижно при всех симметриях.
+    # Переходы по строкам с одинаковыми концами складываются: out[q][t] – число строк q → t.
+    out: List[Dict[int, int]] = []
+    for state in states:  # Список пополняется во время обхода.
+        weights: Dict[int, int] = {}
+        for target, count in _successors(state, trie, rule.block_height).items():
+            number = canonical.get(target)
+            if number is None:
+                orbit = {tuple(code_map[window] if window >= 0 else -1
+                               for window in (reversed(target) if reflect else target))
+                         for code_map, reflect in symmetries}
+                representative = min(orbit)
+                number = index.get(representative)
+                if number is None:
+                    number = index[representative] = len(states)
+                    states.append(representative)
+                    raw_states += len(orbit)  # Все состояния орбиты достижимы.
+                canonical[target] = number
+            weights[number] = weights.get(number, 0) + count
+        out.append(weights)
+
+    # --- Минимизация разбиением на классы ---
+    # Состояния склеиваются, если у них одинаковое суммарное число переходов в каждый класс:
+    # тогда и число продолжений любой длины у них одинаково. Это грубее эквивалентности
+    # автоматов по словам.
+    classes: List[int] = [0] * len(states)
+    class_count: int = 1
+    while True:
+        keys: Dict[Tuple[int, Tuple[Tuple[int, int], ...]], int] = {}
+        refined: List[int] = []
+        for q, weights in enumerate(out):
+            per_class: Dict[int, int] = {}
+            for target, count in weights.items():
+                per_class[classes[target]] = per_class.get(classes[target], 0) + count
+            key = (classes[q], tuple(sorted(per_class.items())))
+            refined.append(keys.setdefault(key, len(keys)))
+        classes = refined
+        if len(keys) == class_count:
+            break  # Разбиение стабилизировалось.
+        class_count = len(keys)
+
+    # --- Переходы между классами с кратностями (по любому представителю класса) ---
+    representative_of: Dict[int, int] = {}
+    for q, cls in enumerate(classes):
+        representative_of.setdefault(cls, q)
+    incoming: List[Dict[int, int]] = [{} for _ in range(class_count)]
+    for cls in range(class_count):
+        for target, count in out[representative_of[cls]].items():
+            sources = incoming[classes[target]]
+            sources[cls] = sources.get(cls, 0) + count
+
+    return RowAutomaton(
+        start=classes[0],
+        incoming=[list(sources.items()) for sources in incoming],
+        raw_states=raw_states,
+    )
+
+
+def transfer_matrix(automaton: RowAutomaton) -> Matrix:
+    """Строит матрицу T[a][b] – число строк, переводящих состояние a в состояние b."""
+    matrix: Matrix = [[0] * automaton.size for _ in range(automaton.size)]
+    for target, sources in enumerate(automaton.incoming):
+        for source, count in sources:
+            matrix[source][target] = count
+    return matrix
+
+
+def count_patterns(M: int, N: int, rule: ColouringRule = ColouringRule(),
+                   strategy: str = "dp", mod: Optional[int] = None) -> int:
+    """
+    Вычисляет количество раскрасок двора из M строк и N столбцов в rule.colours цветов,
+    в которых нет одноцветного прямоугольника из rule.block_height строк и
+    rule.block_width столбцов.
+
+    Параметры:
+      M (int): Число строк двора.
+      N (int): Число столбцов двора.
+      rule (ColouringRule): Правило раскраски (по умолчанию – исходная задача: 2 цвета, 2×2).
+      strategy (str): "dp" – построчная динамика, "matrix" – возведение матрицы в степень.
+      mod (Optional[int]): Если задан, результат вычисляется по модулю mod.
+
+    Возвращает:
+      int: Количество допустимых раскрасок.
+
+    Генерирует:
+      ValueError: Если размеры, правило, mod или strategy некорректны.
+    """
+    rows, cols = normalize_size(M, N, mod)
+    if strategy not in AUTOMATON_STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy!r}")
+    if N > M:
+        # Автомат строится по меньшей стороне: транспонируем двор вместе с прямоугольником.
+        rule = rule._replace(block_height=rule.block_width, block_width=rule.block_height)
+
+    automaton = compile_rule(rule, cols)
+    start: List[int] = [0] * automaton.size
+    start[automaton.start] = 1
+    if strategy == "matrix":
+        dp = vec_mat_pow(start, transfer_matrix(automaton), rows, mod)
+    else:
+        dp = start
+        for _ in range(rows):
+            dp = weighted_dp_step(dp, automaton.incoming, mod)
+
+    result = sum(dp)
+    return result % mod if mod is not None else result
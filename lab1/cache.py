@@ -0,0 +1,331 @@
+"""
+cache.py
+
+Постоянный кэш для подсчёта симпатичных узоров.
+Таблицы переходов хранятся по ширине двора (cols) в памяти (LRU) и в файлах,
+которые открываются через mmap; векторы динамики и ответы хранятся по парам
+(cols, rows), так что запрос с большим rows продолжает счёт с самого длинного
+сохранённого префикса. Все файлы – сырые массивы чисел (array), а не сериализованные
+объекты Python, поэтому чтение чужого или испорченного каталога не выполняет кода:
+в худшем случае файл отбрасывается и данные вычисляются заново.
+"""
+
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lab1.main import UINT64_MAX, CSRTransitions, build_transitions_csr, csr_dp_steps, normalize_size, np
+
+# Ключ префиксов: ширина двора и модуль (None – точные вычисления).
+PrefixKey = Tuple[int, Optional[int]]
+
+
+def _encode_int(value: int) -> bytes:
+    """Неотрицательное число произвольной длины -> байты (little-endian)."""
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), "little")
+
+
+def encode_vector(values: Sequence[int], mod: Optional[int]) -> bytes:
+    """
+    Кодирует вектор динамики. По модулю, не большему 2^64, – массив uint64 (array('Q'));
+    иначе (точные числа) – массив длин array('I') и затем байты самих чисел подряд.
+    """
+    if mod is not None and mod - 1 <= UINT64_MAX:
+        return array("Q", values).tobytes()
+    encoded = [_encode_int(value) for value in values]
+    return array("I", map(len, encoded)).tobytes() + b"".join(encoded)
+
+
+def decode_vector(data: bytes, count: int, mod: Optional[int]) -> Optional[List[int]]:
+    """Обратное к encode_vector; None, если размер или значения не согласуются с форматом."""
+    if mod is not None and mod - 1 <= UINT64_MAX:
+        if len(data) != 8 * count:
+            return None
+        values = array("Q")
+        values.frombytes(data)
+        return None if any(value >= mod for value in values) else values.tolist()
+
+    if len(data) < 4 * count:
+        return None
+    lengths = array("I")
+    lengths.frombytes(data[:4 * count])
+    if 4 * count + sum(lengths) != len(data):
+        return None
+    values: List[int] = []
+    position = 4 * count
+    for length in lengths:
+        values.append(int.from_bytes(data[position:position + length], "little"))
+        position += length
+    if mod is not None and any(value >= mod for value in values):
+        return None
+    return values
+
+
+class PatternCache:
+    """
+    Кэш таблиц переходов и векторов динамики в каталоге cache_dir.
+
+    Файлы каталога:
+      - transitions_<cols>.bin – массивы offsets и targets (uint32) подряд;
+      - dp_<cols>_<mod>_<rows>.bin – вектор динамики после rows строк (encode_vector). Вектор
+        записывается, только если запрос продлил самый длинный сохранённый префикс, и удаляется
+        при вытеснении;
+      - answers_<cols>_<mod>.bin – журнал ответов: записи (rows и длина ответа как array('Q'),
+        затем байты ответа) дописываются в конец, а когда записей становится вдвое больше
+        max_answers, журнал переписывается заново.
+    """
+
+    def __init__(self, cache_dir: str, max_tables: int = 4, max_checkpoints: int = 16,
+                 max_answers: int = 1024) -> None:
+        """
+        Параметры:
+          cache_dir (str): Каталог для файлов кэша (создаётся при необходимости).
+          max_tables (int): Сколько таблиц переходов держать в памяти одновременно.
+          max_checkpoints (int): Сколько векторов динамики хранить для одной пары (cols, mod).
+          max_answers (int): Сколько ответов хранить для одной пары (cols, mod).
+        """
+        if max_tables < 1 or max_checkpoints < 1 or max_answers < 1:
+            raise ValueError("Cache limits must be positive")
+        self.cache_dir: str = cache_dir
+        self.max_tables: int = max_tables
+        self.max_checkpoints: int = max_checkpoints
+        self.max_answers: int = max_answers
+        os.makedirs(cache_dir, exist_ok=True)
+        # Таблицы переходов по cols в порядке последнего использования.
+        self._tables: "OrderedDict[int, CSRTransitions]" = OrderedDict()
+        # Ответы по (cols, mod) в порядке добавления: при переполнении вытесняется самый старый.
+        self._answers: Dict[PrefixKey, Dict[int, int]] = {}
+        # Отсортированные rows, для которых на диске лежит вектор динамики (сами векторы
+        # читаются с диска только при продолжении счёта).
+        self._checkpoints: Dict[PrefixKey, List[int]] = {}
+        # Сколько записей сейчас в журнале ответов каждой пары (cols, mod).
+        self._journal_records: Dict[PrefixKey, int] = {}
+
+    # --- Таблицы переходов ---
+
+    def transitions(self, cols: int) -> CSRTransitions:
+        """
+        Возвращает таблицу переходов для ширины cols: из памяти, из файла
+        (через mmap) или, если её ещё нет, строит и сохраняет на диск.
+        """
+        table = self._tables.get(cols)
+        if table is not None:
+            self._tables.move_to_end(cols)
+            return table
+
+        table = self._load_table(cols)
+        if table is None:
+            table = build_transitions_csr(cols)
+            self._store_table(cols, table)
+
+        self._tables[cols] = table
+        if len(self._tables) > self.max_tables:
+            self._tables.popitem(last=False)  # Вытесняем давно не использованную таблицу.
+        return table
+
+    def _table_path(self, cols: int) -> str:
+        return os.path.join(self.cache_dir, f"transitions_{cols}.bin")
+
+    def _load_table(self, cols: int) -> Optional[CSRTransitions]:
+        """Отображает файл таблицы в память; возвращает None, если файла нет или он повреждён."""
+        path = self._table_path(cols)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        masks = 2 ** cols
+        # Файл должен состоять из целых слов uint32 и вмещать хотя бы массив offsets.
+        if len(mapped) % 4 or len(mapped) < 4 * (masks + 1):
+            mapped.close()
+            return None
+        words = memoryview(mapped).cast("I")
+        offsets, targets = words[:masks + 1], words[masks + 1:]
+        # Размер согласуется с заголовком, offsets не убывают, а все targets – маски ширины cols.
+        if np is not None:
+            bounds = np.frombuffer(offsets, dtype=np.uint32)
+            stored = np.frombuffer(targets, dtype=np.uint32)
+            valid = (len(targets) == bounds[-1] and bounds[0] == 0
+                     and bool((np.diff(bounds.astype(np.int64)) >= 0).all())
+                     and (len(stored) == 0 or int(stored.max()) < masks))
+            del bounds, stored
+        else:
+            valid = (len(targets) == offsets[masks] and offsets[0] == 0
+                     and all(offsets[mask] <= offsets[mask + 1] for mask in range(masks))
+                     and all(target < masks for target in targets))
+        if not valid:
+            offsets.release()
+            targets.release()
+            words.release()
+            mapped.close()
+            return None  # Таблицу построим заново.
+        return CSRTransitions(offsets, targets)
+
+    def _store_table(self, cols: int, table: CSRTransitions) -> None:
+        """Атомарно записывает таблицу на диск: сначала во временный файл, затем переименование."""
+        path = self._table_path(cols)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            array("I", table.offsets).tofile(f)
+            array("I", table.targets).tofile(f)
+        os.replace(tmp_path, path)
+
+    # --- Ответы и векторы динамики ---
+
+    def count(self, M: int, N: int, mod: Optional[int] = None) -> int:
+        """
+        Вычисляет количество симпатичных узоров для двора M×N (как count_pretty_patterns),
+        переиспользуя сохранённые ответы и продолжая динамику (csr_dp_steps – на NumPy, если
+        он установлен) с самого длинного сохранённого префикса, не превосходящего rows.
+        """
+        rows, cols = normalize_size(M, N, mod)
+        key = (cols, mod)
+        answers = self._load_answers(cols, mod)
+        if rows in answers:
+            return answers[rows]
+
+        checkpoints = self._load_checkpoints(cols, mod)
+        start, dp = 1, None
+        for saved_rows in reversed(checkpoints):
+            if saved_rows <= rows:
+                dp = self._read_checkpoint(cols, mod, saved_rows)
+                if dp is not None:
+                    start = saved_rows
+                    break
+                checkpoints.remove(saved_rows)  # Файл повреждён или удалён – забываем о нём.
+        if dp is None:
+            dp = [1] * 2 ** cols  # Первая строка раскрашивается произвольно.
+
+        dp = csr_dp_steps(dp, self.transitions(cols), rows - start, mod)
+        result = sum(dp) % mod if mod is not None else sum(dp)
+
+        # Сначала файлы, потом память: если запись не удалась, состояние кэша не меняется.
+        extends = not checkpoints or rows > checkpoints[-1]
+        if extends:
+            self._store_checkpoint(cols, mod, rows, dp)
+        self._append_answer(cols, mod, rows, result)
+        answers[rows] = result
+        if len(answers) > self.max_answers:
+            del answers[next(iter(answers))]  # Вытесняем самый старый ответ.
+        if extends:
+            checkpoints.append(rows)
+            if len(checkpoints) > self.max_checkpoints:
+                # Короткие префиксы полезны меньше всего: с длинного можно продолжить дальше.
+                self._remove(self._checkpoint_path(cols, mod, checkpoints.pop(0)))
+        self._checkpoints[key] = checkpoints
+        return result
+
+    def checkpoint_rows(self, cols: int, mod: Optional[int] = None) -> List[int]:
+        """Возвращает отсортированный список rows, для которых сохранён вектор динамики."""
+        return list(self._load_checkpoints(cols, mod))
+
+    def _file_prefix(self, cols: int, mod: Optional[int]) -> str:
+        return f"{cols}_{mod if mod is not None else 'exact'}"
+
+    def _checkpoint_path(self, cols: int, mod: Optional[int], rows: int) -> str:
+        return os.path.join(self.cache_dir, f"dp_{self._file_prefix(cols, mod)}_{rows}.bin")
+
+    def _answers_path(self, cols: int, mod: Optional[int]) -> str:
+        return os.path.join(self.cache_dir, f"answers_{self._file_prefix(cols, mod)}.bin")
+
+    def _load_checkpoints(self, cols: int, mod: Optional[int]) -> List[int]:
+        """Находит в каталоге сохранённые векторы пары (cols, mod); содержимое читается позже."""
+        key = (cols, mod)
+        if key not in self._checkpoints:
+            name_start, name_end = f"dp_{self._file_prefix(cols, mod)}_", ".bin"
+            found: List[int] = []
+            for name in os.listdir(self.cache_dir):
+                rows_text = name[len(name_start):-len(name_end)]
+                if name.startswith(name_start) and name.endswith(name_end) and rows_text.isdigit():
+                    found.append(int(rows_text))
+            self._checkpoints[key] = sorted(found)
+        return self._checkpoints[key]
+
+    def _read_checkpoint(self, cols: int, mod: Optional[int], rows: int) -> Optional[List[int]]:
+        try:
+            with open(self._checkpoint_path(cols, mod, rows), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return decode_vector(data, 2 ** cols, mod)
+
+    def _load_answers(self, cols: int, mod: Optional[int]) -> Dict[int, int]:
+        """Читает журнал ответов пары (cols, mod); недописанная последняя запись отбрасывается."""
+        key = (cols, mod)
+        if key in self._answers:
+            return self._answers[key]
+
+        answers: Dict[int, int] = {}
+        records = 0
+        path = self._answers_path(cols, mod)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            position = 0
+            while position < len(data):
+                header = array("Q")
+                if len(data) - position >= 16:
+                    header.frombytes(data[position:position + 16])
+                if len(header) != 2 or len(data) - position - 16 < header[1]:
+                    # Недописанная запись: следующий ответ перепишет журнал без неё.
+                    records = 2 * self.max_answers
+                    break
+                rows, length = header
+                answer = int.from_bytes(data[position + 16:position + 16 + length], "little")
+                position += 16 + length
+                records += 1
+                answers.pop(rows, None)
+                answers[rows] = answer
+                if len(answers) > self.max_answers:
+                    del answers[next(iter(answers))]
+
+        self._answers[key] = answers
+        self._journal_records[key] = records
+        return answers
+
+    def _store_checkpoint(self, cols: int, mod: Optional[int], rows: int, dp: List[int]) -> None:
+        """Атомарно записывает вектор динамики; при ошибке временный файл удаляется."""
+        self._write_atomic(self._checkpoint_path(cols, mod, rows), encode_vector(dp, mod))
+
+    def _append_answer(self, cols: int, mod: Optional[int], rows: int, answer: int) -> None:
+        """
+        Дописывает ответ в журнал. Когда журнал вдвое длиннее max_answers, он атомарно
+        переписывается только текущими ответами, так что запись стоит O(1) амортизированно.
+        """
+        key = (cols, mod)
+        path = self._answers_path(cols, mod)
+        if self._journal_records[key] + 1 <= 2 * self.max_answers:
+            with open(path, "ab") as f:
+                f.write(self._encode_record(rows, answer))
+            self._journal_records[key] += 1
+            return
+
+        kept = list(self._answers[key].items())
+        kept = kept[max(len(kept) - self.max_answers + 1, 0):] + [(rows, answer)]
+        self._write_atomic(path, b"".join(self._encode_record(*record) for record in kept))
+        self._journal_records[key] = len(kept)
+
+    @staticmethod
+    def _encode_record(rows: int, answer: int) -> bytes:
+        encoded = _encode_int(answer)
+        return array("Q", (rows, len(encoded))).tobytes() + encoded
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,5 +1,45 @@
+from lab1.recurrence import berlekamp_massey, is_prime, linear_recurrence_term
 from utils import time_memory_decorator
-from typing import Dict, List
+import math
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, islice
+from operator import mul
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для стратегии "numpy".
+    np = None
+
+if TYPE_CHECKING:
+    from lab1.cache import PatternCache
+
+# Квадратная матрица целых чисел (матрица переходов между строками).
+Matrix = List[List[int]]
+# Списки переходов: transitions[mask1] – последовательность допустимых mask2.
+Transitions = Sequence[Sequence[int]]
+
+# Доступные способы подсчёта узоров.
+STRATEGIES = ("auto", "dp", "matrix", "numpy", "profile", "recurrence", "symmetric")
+# Стратегии, которые строят таблицу переходов и принимают параметр workers.
+WORKER_STRATEGIES = ("dp", "numpy")
+# Стратегии, которые можно выполнить через постоянный кэш (построчная динамика по таблице переходов).
+CACHE_STRATEGIES = ("auto", "dp", "numpy")
+
+# Наибольшее значение, помещающееся в uint64.
+UINT64_MAX = 2 ** 64 - 1
+
+# Начиная с этой ширины стратегия "auto" выбирает динамику по изломанному профилю:
+# число переходов между строками растёт быстрее, чем 2^cols · cols. Порог выбран по замерам:
+# при ширине 10 обе стратегии работают примерно одинаково, с 11 профиль заметно быстрее.
+PROFILE_MIN_WIDTH = 11
+
+# Сколько десятичных цифр точного ответа file_io может записать: в Python 3.11+ int длиннее
+# sys.get_int_max_str_digits() цифр не преобразуется в строку (0 – ограничение снято).
+MAX_EXACT_DIGITS = getattr(sys, "get_int_max_str_digits", lambda: 0)()
 
 
 def is_valid_transition(mask1: int, mask2: int, cols: int) -> bool:
@@ -15,17 +55,590 @@ def is_valid_transition(mask1: int, mask2: int, cols: int) -> bool:
     Возвращает:
       bool: True, если переход допустим, иначе False.
     """
-    for i in range(cols - 1):
-        a = (mask1 >> i) & 1
-        b = (mask1 >> (i + 1)) & 1
-        c = (mask2 >> i) & 1
-        d = (mask2 >> (i + 1)) & 1
-        if a == b == c == d:
-            return False
-    return True
+    # Бит i маски показывает, совпадают ли цвета в столбцах i и i + 1 (для строк)
+    # либо в одном столбце двух строк (для вертикали). Квадрат 2×2 одноцветен,
+    # когда совпадают обе горизонтальные пары и левая вертикальная пара.
+    same_horizontal_1 = ~(mask1 ^ (mask1 >> 1))
+    same_horizontal_2 = ~(mask2 ^ (mask2 >> 1))
+    same_vertical = ~(mask1 ^ mask2)
+    squares = same_horizontal_1 & same_horizontal_2 & same_vertical & ((1 << (cols - 1)) - 1)
+    return squares == 0
+
+
+def valid_successors(mask1: int, cols: int) -> List[int]:
+    """
+    Перечисляет все раскраски mask2, которые можно положить сразу после mask1.
+    Маска mask2 строится по столбцам слева направо: каждое частичное решение
+    продолжается только допустимыми битами, поэтому работа пропорциональна
+    числу допустимых переходов, а не 2^cols.
+
+    Параметры:
+      mask1 (int): Битовая маска предыдущей строки.
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      List[int]: Список допустимых масок следующей строки.
+    """
+    partial: List[int] = [0, 1]  # Варианты для столбца 0 ограничений не имеют.
+    for i in range(1, cols):
+        high: int = 1 << i
+        colour: int = (mask1 >> i) & 1
+        if ((mask1 >> (i - 1)) & 1) != colour:
+            # Клетки i - 1 и i предыдущей строки разного цвета: квадрат невозможен.
+            partial += [prefix | high for prefix in partial]
+            continue
+        extended: List[int] = []
+        for prefix in partial:
+            if ((prefix >> (i - 1)) & 1) == colour:
+                # Три клетки квадрата уже одного цвета: четвёртая обязана быть другой.
+                extended.append(prefix | ((colour ^ 1) << i))
+            else:
+                extended.append(prefix)
+                extended.append(prefix | high)
+        partial = extended
+    return partial
+
+
+def build_transitions(cols: int) -> List[List[int]]:
+    """
+    Строит списки допустимых переходов для всех 2^cols раскрасок строки.
+
+    Параметры:
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      List[List[int]]: transitions[mask1] – список допустимых mask2.
+    """
+    return [valid_successors(mask1, cols) for mask1 in range(2 ** cols)]
+
+
+class CSRTransitions:
+    """
+    Списки переходов в сжатом виде (CSR): переходы из mask1 – это
+    targets[offsets[mask1]:offsets[mask1 + 1]]. offsets и targets – любые
+    целочисленные буферы с поддержкой срезов (array, memoryview над mmap-файлом).
+    """
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, offsets: Sequence[int], targets: Sequence[int]) -> None:
+        self.offsets: Sequence[int] = offsets  # Начало списка каждой маски, длина 2^cols + 1.
+        self.targets: Sequence[int] = targets  # Все списки переходов подряд.
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, mask: int) -> Sequence[int]:
+        return self.targets[self.offsets[mask]:self.offsets[mask + 1]]
+
+
+def _successors_chunk(task: Tuple[int, int, int]) -> Tuple[array, array]:
+    """Строит переходы для масок [first, last): степени масок и их списки переходов подряд."""
+    cols, first, last = task
+    degrees = array("I")
+    targets = array("I")
+    for mask1 in range(first, last):
+        successors = valid_successors(mask1, cols)
+        degrees.append(len(successors))
+        targets.extend(successors)
+    return degrees, targets
+
+
+def build_transitions_csr(cols: int, workers: Optional[int] = None) -> CSRTransitions:
+    """
+    Строит таблицу переходов сразу в формате CSR, не создавая списков Python.
+    Диапазон масок делится на части, которые при workers > 1 обрабатываются
+    в пуле процессов; каждый процесс возвращает компактные массивы array('I').
+
+    Параметры:
+      cols (int): Число столбцов (длина строки).
+      workers (Optional[int]): Число процессов (None или 1 – без пула, в текущем процессе).
+
+    Возвращает:
+      CSRTransitions: Таблица переходов.
+
+    Генерирует:
+      ValueError: Если workers задан и не является положительным целым числом.
+    """
+    if workers is None:
+        workers = 1
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError("workers must be a positive integer")
+
+    total_masks: int = 2 ** cols
+    # Несколько частей на процесс, чтобы выровнять нагрузку между ними.
+    chunk: int = max(1, -(-total_masks // (workers * 4)))
+    tasks = [(cols, first, min(first + chunk, total_masks)) for first in range(0, total_masks, chunk)]
+
+    offsets = array("I", [0])
+    targets = array("I")
+
+    def append(parts) -> None:
+        for degrees, chunk_targets in parts:
+            offsets.extend(islice(accumulate(degrees, initial=offsets[-1]), 1, None))
+            targets.extend(chunk_targets)
+
+    if workers == 1 or len(tasks) == 1:
+        append(map(_successors_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            append(pool.map(_successors_chunk, tasks))  # Результаты приходят в порядке частей.
+    return CSRTransitions(offsets, targets)
+
+
+def reverse_bits(mask: int, cols: int) -> int:
+    """
+    Отражает раскраску строки слева направо.
+
+    Параметры:
+      mask (int): Битовая маска строки.
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      int: Маска, у которой бит i равен биту cols - 1 - i исходной маски.
+    """
+    return int(format(mask, f"0{cols}b")[::-1], 2)
+
+
+def symmetry_classes(cols: int) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Разбивает раскраски строки на классы эквивалентности относительно замены цветов
+    (mask ↔ ~mask) и отражения строки. Правило 2×2 инвариантно относительно обеих
+    симметрий, поэтому у всех масок одного класса одинаковое число способов.
+
+    Параметры:
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      Tuple[List[int], List[int], List[int]]:
+        - representatives – наименьшая маска каждого класса;
+        - class_of – номер класса для каждой маски;
+        - class_sizes – число масок в каждом классе (от 1 до 4).
+    """
+    full: int = (1 << cols) - 1
+    class_of: List[int] = [-1] * (full + 1)
+    representatives: List[int] = []
+    class_sizes: List[int] = []
+    for mask in range(full + 1):
+        if class_of[mask] != -1:
+            continue  # Маска уже попала в класс меньшего представителя.
+        mirrored = reverse_bits(mask, cols)
+        orbit = {mask, mask ^ full, mirrored, mirrored ^ full}
+        for member in orbit:
+            class_of[member] = len(representatives)
+        representatives.append(mask)
+        class_sizes.append(len(orbit))
+    return representatives, class_of, class_sizes
+
+
+def build_symmetric_transitions(cols: int) -> Tuple[List[int], List[List[Tuple[int, int]]]]:
+    """
+    Строит переходы между классами симметрии раскрасок строки.
+    Матрица переходов симметрична, поэтому число способов для класса B в следующей
+    строке равно сумме по классам A: dp[A] · (число масок из A, соседних с представителем B).
+
+    Параметры:
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      Tuple[List[int], List[List[Tuple[int, int]]]]:
+        - class_sizes – число масок в каждом классе;
+        - reduced[B] – список пар (A, кратность перехода).
+    """
+    representatives, class_of, class_sizes = symmetry_classes(cols)
+    reduced: List[List[Tuple[int, int]]] = []
+    for representative in representatives:
+        multiplicity: Dict[int, int] = {}
+        for mask in valid_successors(representative, cols):
+            cls = class_of[mask]
+            multiplicity[cls] = multiplicity.get(cls, 0) + 1
+        reduced.append(list(multiplicity.items()))
+    return class_sizes, reduced
+
+
+def build_transfer_matrix(cols: int) -> Matrix:
+    """
+    Строит матрицу переходов T размера 2^cols × 2^cols, где T[mask1][mask2] = 1,
+    если строку mask2 можно положить сразу после строки mask1.
+
+    Параметры:
+      cols (int): Число столбцов (длина строки).
+
+    Возвращает:
+      Matrix: Матрица переходов из нулей и единиц.
+    """
+    total_masks: int = 2 ** cols
+    transfer: Matrix = [[0] * total_masks for _ in range(total_masks)]
+    for mask1, successors in enumerate(build_transitions(cols)):
+        row = transfer[mask1]
+        for mask2 in successors:
+            row[mask2] = 1
+    return transfer
+
+
+def mat_mult(a: Matrix, b: Matrix, mod: Optional[int] = None) -> Matrix:
+    """
+    Перемножает две квадратные матрицы, при необходимости по модулю mod.
+
+    Параметры:
+      a (Matrix): Левая матрица.
+      b (Matrix): Правая матрица.
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      Matrix: Произведение a·b.
+    """
+    columns = list(zip(*b))  # Транспонируем b, чтобы брать столбцы как кортежи.
+    result: Matrix = [[sum(map(mul, row, col)) for col in columns] for row in a]
+    if mod is not None:
+        result = [[value % mod for value in row] for row in result]
+    return result
+
+
+def vec_mat_mult(vector: List[int], matrix: Matrix, mod: Optional[int] = None) -> List[int]:
+    """
+    Умножает вектор-строку на матрицу, при необходимости по модулю mod.
+
+    Параметры:
+      vector (List[int]): Вектор-строка.
+      matrix (Matrix): Квадратная матрица.
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      List[int]: Произведение vector·matrix.
+    """
+    result: List[int] = [sum(map(mul, vector, col)) for col in zip(*matrix)]
+    if mod is not None:
+        result = [value % mod for value in result]
+    return result
+
+
+def vec_mat_pow(vector: List[int], matrix: Matrix, power: int, mod: Optional[int] = None) -> List[int]:
+    """
+    Вычисляет vector·matrix^power бинарным возведением в степень.
+    Требуется O(log power) умножений матриц.
+
+    Параметры:
+      vector (List[int]): Начальный вектор-строка.
+      matrix (Matrix): Квадратная матрица переходов.
+      power (int): Неотрицательная степень.
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      List[int]: Вектор vector·matrix^power.
+    """
+    result: List[int] = list(vector)
+    base: Matrix = matrix
+    while power:
+        if power & 1:
+            result = vec_mat_mult(result, base, mod)
+        power >>= 1
+        if power:
+            base = mat_mult(base, base, mod)
+    return result
 
 
-def count_pretty_patterns(M: int, N: int) -> int:
+def dp_step(dp_prev: List[int], transitions: Transitions, mod: Optional[int] = None) -> List[int]:
+    """
+    Выполняет один шаг построчной динамики: переносит числа способов
+    из предыдущей строки во все допустимые следующие.
+
+    Параметры:
+      dp_prev (List[int]): dp_prev[mask] – число способов закончить раскраску строкой mask.
+      transitions (Transitions): Списки допустимых переходов.
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      List[int]: Вектор динамики для следующей строки.
+    """
+    dp_curr: List[int] = [0] * len(dp_prev)
+    for mask1, ways in enumerate(dp_prev):
+        if ways:
+            for mask2 in transitions[mask1]:
+                dp_curr[mask2] += ways
+    if mod is not None:
+        dp_curr = [ways % mod for ways in dp_curr]
+    return dp_curr
+
+
+def _count_row_dp(rows: int, cols: int, mod: Optional[int], workers: Optional[int] = None) -> int:
+    """Построчное динамическое программирование: O(rows · E), E – число допустимых переходов."""
+    # Предварительно вычисляем допустимые переходы между двумя соседними строками:
+    # списками в одном процессе или компактной таблицей CSR в пуле процессов.
+    valid_transitions: Transitions = (
+        build_transitions(cols) if workers is None else build_transitions_csr(cols, workers)
+    )
+
+    # Инициализируем динамическое программирование:
+    # dp_prev[mask] хранит количество способов получить раскраску mask для предыдущей строки.
+    dp_prev: List[int] = [1] * 2 ** cols
+
+    # Итеративно обрабатываем каждую последующую строку.
+    for _ in range(1, rows):
+        dp_prev = dp_step(dp_prev, valid_transitions, mod)
+
+    return sum(dp_prev)
+
+
+def weighted_dp_step(dp_prev: List[int], incoming: List[List[Tuple[int, int]]],
+                     mod: Optional[int] = None) -> List[int]:
+    """
+    Выполняет шаг динамики по переходам с кратностями.
+
+    Параметры:
+      dp_prev (List[int]): Числа способов для состояний предыдущей строки.
+      incoming (List[List[Tuple[int, int]]]): incoming[b] – пары (a, кратность перехода a → b).
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      List[int]: Вектор динамики для следующей строки.
+    """
+    dp_curr: List[int] = [sum(dp_prev[source] * count for source, count in sources) for sources in incoming]
+    if mod is not None:
+        dp_curr = [ways % mod for ways in dp_curr]
+    return dp_curr
+
+
+def _iter_symmetric_dp(cols: int, mod: Optional[int]) -> Iterator[int]:
+    """Построчная динамика по классам симметрии: примерно в 4 раза меньше состояний и переходов."""
+    class_sizes, reduced = build_symmetric_transitions(cols)
+    # Каждая маска первой строки даёт ровно один способ.
+    dp_prev: List[int] = [1] * len(class_sizes)
+    while True:
+        yield sum(map(mul, class_sizes, dp_prev))
+        dp_prev = weighted_dp_step(dp_prev, reduced, mod)
+
+
+def _count_symmetric_dp(rows: int, cols: int, mod: Optional[int]) -> int:
+    return next(islice(_iter_symmetric_dp(cols, mod), rows - 1, None))
+
+
+def _numpy_dp_steps(dp_prev: Sequence[int], table: CSRTransitions, steps: int, mod: Optional[int]):
+    """
+    Выполняет steps шагов динамики, каждый – одно разреженное произведение матрицы на вектор.
+
+    Переходы хранятся в формате CSR (offsets, targets). Матрица переходов симметрична,
+    поэтому targets[offsets[b]:offsets[b + 1]] – это и предшественники строки b, и новое
+    значение dp[b] – сумма dp по этому отрезку (np.add.reduceat). Пока числа помещаются
+    в uint64, используется он; иначе вычисления продолжаются в точных object-массивах.
+    Возвращает массив NumPy.
+    """
+    bounds = np.frombuffer(table.offsets, dtype=np.uint32).astype(np.int64)
+    targets = np.frombuffer(table.targets, dtype=np.uint32).astype(np.int64)
+    # У каждой маски есть хотя бы один допустимый сосед (её дополнение), поэтому
+    # все отрезки непусты и reduceat корректно суммирует каждый из них.
+    offsets = bounds[:-1]
+    max_degree: int = int(np.diff(bounds).max())
+
+    if mod is not None:
+        # Сумма max_degree слагаемых, меньших mod, не должна переполнить uint64.
+        dtype = np.uint64 if (mod - 1) * max_degree <= UINT64_MAX else object
+        dp = np.array(dp_prev, dtype=dtype)
+        for _ in range(steps):
+            dp = np.add.reduceat(dp[targets], offsets) % mod
+        return dp
+
+    bound: int = max(dp_prev)  # Верхняя оценка значений dp.
+    dp = np.array(dp_prev, dtype=np.uint64 if bound <= UINT64_MAX else object)
+    for _ in range(steps):
+        bound *= max_degree
+        if dp.dtype != object and bound > UINT64_MAX:
+            dp = dp.astype(object)  # Дальше числа не помещаются в uint64.
+        dp = np.add.reduceat(dp[targets], offsets)
+    return dp
+
+
+def csr_dp_steps(dp_prev: List[int], table: CSRTransitions, steps: int, mod: Optional[int] = None) -> List[int]:
+    """
+    Выполняет steps шагов построчной динамики по таблице CSR: с NumPy – векторизованно
+    (как стратегия "numpy"), без него – обычным dp_step.
+
+    Параметры:
+      dp_prev (List[int]): Вектор динамики, с которого продолжается счёт.
+      table (CSRTransitions): Таблица переходов той же ширины.
+      steps (int): Сколько строк добавить.
+      mod (Optional[int]): Модуль арифметики (None – точные вычисления).
+
+    Возвращает:
+      List[int]: Вектор динамики после steps шагов.
+    """
+    if np is None:
+        dp = dp_prev
+        for _ in range(steps):
+            dp = dp_step(dp, table, mod)
+        return dp
+    return [int(ways) for ways in _numpy_dp_steps(dp_prev, table, steps, mod).tolist()]
+
+
+def _count_numpy_dp(rows: int, cols: int, mod: Optional[int], workers: Optional[int] = None) -> int:
+    """Построчная динамика на NumPy (см. _numpy_dp_steps)."""
+    if np is None:
+        raise ImportError("NumPy is required for the 'numpy' strategy")
+
+    table = build_transitions_csr(cols, workers)
+    dp = _numpy_dp_steps([1] * 2 ** cols, table, rows - 1, mod)
+    result = int(dp.astype(object).sum())
+    return result % mod if mod is not None else result
+
+
+def _count_matrix_power(rows: int, cols: int, mod: Optional[int]) -> int:
+    """Возведение матрицы переходов в степень rows - 1: O(8^cols · log rows)."""
+    transfer: Matrix = build_transfer_matrix(cols)
+    # Начальный вектор: первая строка может быть раскрашена любым способом.
+    start: List[int] = [1] * len(transfer)
+    return sum(vec_mat_pow(start, transfer, rows - 1, mod))
+
+
+def _iter_broken_profile(cols: int, mod: Optional[int]) -> Iterator[int]:
+    """
+    Динамика по изломанному профилю: клетки заполняются по одной, O(rows · cols · 2^cols).
+
+    Профиль хранит cols + 1 бит: младшие cols бит – последние раскрашенные клетки
+    каждого столбца (слева от текущей клетки – из текущей строки, начиная с неё –
+    из предыдущей), старший бит – цвет клетки по диагонали сверху-слева.
+    """
+    full: int = 1 << cols
+    low: int = full - 1
+    # Первая строка раскрашивается произвольно, диагонального бита у неё нет.
+    dp: List[int] = [1] * full + [0] * full
+
+    while True:
+        # После завершения строки диагональные биты равны нулю, сумма – ответ для текущего rows.
+        yield sum(dp)
+        for c in range(cols):
+            dp_next: List[int] = [0] * (2 * full)
+            bit: int = 1 << c
+            keep_diagonal: bool = c + 1 < cols  # В конце строки диагональ не нужна.
+            for state, ways in enumerate(dp):
+                if not ways:
+                    continue
+                profile = state & low
+                up = (profile >> c) & 1  # Клетка над текущей.
+                base = profile & ~bit
+                if keep_diagonal:
+                    # Клетка над текущей станет диагональной для следующей клетки.
+                    base |= up << cols
+                if c and (state >> cols) == up == ((profile >> (c - 1)) & 1):
+                    # Три клетки квадрата уже одного цвета: текущая обязана быть другой.
+                    dp_next[base | ((up ^ 1) << c)] += ways
+                else:
+                    dp_next[base] += ways
+                    dp_next[base | bit] += ways
+            if mod is not None:
+                dp_next = [ways % mod for ways in dp_next]
+            dp = dp_next
+
+
+def _count_broken_profile(rows: int, cols: int, mod: Optional[int]) -> int:
+    return next(islice(_iter_broken_profile(cols, mod), rows - 1, None))
+
+
+def _count_recurrence(rows: int, cols: int, mod: Optional[int]) -> int:
+    """
+    Ответы для фиксированной ширины удовлетворяют линейному соотношению, порядок которого
+    не больше числа классов симметрии (размера сжатой матрицы переходов). Первые 2·d членов
+    считаются обычной динамикой, соотношение восстанавливается алгоритмом Берлекэмпа–Мэсси,
+    а член с номером rows − 1 вычисляется методом Китамасы.
+    """
+    order_bound: int = len(symmetry_classes(cols)[0])
+    terms: List[int] = list(islice(iter_pattern_counts(cols, mod), 2 * order_bound))
+    if rows <= len(terms):
+        return terms[rows - 1]
+    coefficients = berlekamp_massey(terms, mod)
+    return linear_recurrence_term(coefficients, terms, rows - 1, mod)
+
+
+def normalize_size(M: int, N: int, mod: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Проверяет размеры двора и модуль и приводит двор к виду rows × cols,
+    где rows – большая сторона, cols – меньшая.
+
+    Параметры:
+      M (int): Одна сторона двора.
+      N (int): Другая сторона двора.
+      mod (Optional[int]): Модуль арифметики или None.
+
+    Возвращает:
+      Tuple[int, int]: Пара (rows, cols).
+
+    Генерирует:
+      ValueError: Если M или N не являются положительными целыми числами
+                  либо если mod не является положительным целым числом.
+    """
+    # Проверка корректности входных данных
+    if not (isinstance(M, int) and isinstance(N, int)):
+        raise ValueError("M and N must be integers")
+    if M < 1 or N < 1:
+        raise ValueError("M and N must be positive integers")
+    if mod is not None and (not isinstance(mod, int) or mod < 1):
+        raise ValueError("mod must be a positive integer")
+
+    # Больший размер будем считать числом строк, меньший – числом столбцов.
+    return max(M, N), min(M, N)
+
+
+def iter_pattern_counts(cols: int, mod: Optional[int] = None) -> Iterator[int]:
+    """
+    Бесконечно перечисляет количества симпатичных узоров для дворов cols×1, cols×2, ...
+    Используется одна построчная динамика, поэтому первые R ответов стоят как один подсчёт
+    для rows = R. Движок выбирается по ширине так же, как в стратегии "auto".
+
+    Параметры:
+      cols (int): Ширина двора (положительное целое число).
+      mod (Optional[int]): Если задан, ответы вычисляются по модулю mod.
+
+    Возвращает:
+      Iterator[int]: Ответы для rows = 1, 2, 3, ...
+    """
+    _, cols = normalize_size(cols, cols, mod)
+    counts = _iter_broken_profile(cols, mod) if cols >= PROFILE_MIN_WIDTH else _iter_symmetric_dp(cols, mod)
+    for count in counts:
+        yield count % mod if mod is not None else count
+
+
+def count_pretty_patterns_batch(sizes: Sequence[Tuple[int, int]], mod: Optional[int] = None,
+                                cache: Optional["PatternCache"] = None) -> List[int]:
+    """
+    Отвечает на набор запросов (M, N). Запросы группируются по меньшей стороне,
+    и для каждой ширины выполняется одна динамика до наибольшего запрошенного rows,
+    так что K запросов одной ширины стоят как один.
+
+    Параметры:
+      sizes (Sequence[Tuple[int, int]]): Размеры дворов.
+      mod (Optional[int]): Если задан, ответы вычисляются по модулю mod.
+      cache (Optional[PatternCache]): Если задан, запросы одной ширины передаются в cache.count
+              по возрастанию rows, так что каждый продолжает динамику с предыдущего.
+
+    Возвращает:
+      List[int]: Ответы в порядке запросов.
+
+    Генерирует:
+      ValueError: Если какой-либо размер или mod некорректен.
+    """
+    # cols -> rows -> номера запросов с этим размером.
+    queries_by_width: Dict[int, Dict[int, List[int]]] = {}
+    for index, (M, N) in enumerate(sizes):
+        rows, cols = normalize_size(M, N, mod)
+        queries_by_width.setdefault(cols, {}).setdefault(rows, []).append(index)
+
+    results: List[int] = [0] * len(sizes)
+    if cache is not None:
+        for cols, queries in sorted(queries_by_width.items()):
+            for rows in sorted(queries):
+                count = cache.count(rows, cols, mod)
+                for index in queries[rows]:
+                    results[index] = count
+        return results
+
+    for cols, queries in queries_by_width.items():
+        counts = iter_pattern_counts(cols, mod)
+        for rows, count in zip(range(1, max(queries) + 1), counts):
+            for index in queries.get(rows, ()):
+                results[index] = count
+    return results
+
+
+def count_pretty_patterns(M: int, N: int, strategy: str = "auto", mod: Optional[int] = None,
+                          workers: Optional[int] = None, cache: Optional["PatternCache"] = None) -> int:
     """
     Вычисляет количество симпатичных узоров для двора размера M×N.
     Узор считается симпатичным, если нигде не встречается квадрат 2×2,
@@ -34,74 +647,138 @@ def count_pretty_patterns(M: int, N: int) -> int:
     Параметры:
       M (int): Число, представляющее одну сторону двора (должно быть положительным).
       N (int): Число, представляющее другую сторону двора (должно быть положительным).
-              Допускается условие 1 ≤ M*N ≤ 30.
+      strategy (str): Способ вычисления:
+              - "auto" – "profile" для ширины от PROFILE_MIN_WIDTH, иначе "symmetric";
+              - "dp" – построчная динамика, время линейно по длинной стороне;
+              - "matrix" – возведение матрицы переходов в степень, время
+                логарифмично по длинной стороне, но O(8^cols) на каждое умножение:
+                годится для сторон порядка 10^18 лишь при ширине до ~7 (при cols = 8 это
+                уже минуты); для более широких дворов и простого mod – "recurrence";
+              - "numpy" – построчная динамика, где каждый шаг выполняется одним
+                векторизованным произведением разреженной матрицы на вектор (нужен NumPy);
+              - "profile" – динамика по изломанному профилю без таблицы переходов,
+                подходит для широких дворов (меньшая сторона до ~20);
+              - "recurrence" – восстановление линейного рекуррентного соотношения по первым
+                ответам (Берлекэмп–Мэсси) и вычисление ответа методом Китамасы;
+                требует простого mod, подходит для астрономических rows;
+              - "symmetric" – построчная динамика по классам раскрасок, совпадающих
+                с точностью до замены цветов и отражения строки.
+      mod (Optional[int]): Если задан, результат вычисляется по модулю mod
+              (иначе точное значение, которое быстро растёт с размером двора).
+      workers (Optional[int]): Число процессов, строящих таблицу переходов в формате CSR.
+              Допустим только со стратегиями "dp" и "numpy" и без cache. None – без пула
+              процессов: "dp" строит списки, "numpy" – таблицу CSR в текущем процессе.
+      cache (Optional[PatternCache]): Постоянный кэш (lab1/cache.py). Если задан, подсчёт
+              выполняет cache.count: построчная динамика на CSR/NumPy, продолжающая счёт с
+              сохранённого префикса. Допустим только со стратегиями "auto", "dp" и "numpy".
 
     Возвращает:
-      int: Количество различных симпатичных узоров.
+      int: Количество различных симпатичных узоров (по модулю mod, если он задан).
 
     Генерирует:
       ValueError: Если M или N не являются положительными целыми числами,
-                  либо если произведение M*N превышает 30.
+                  если mod не является положительным целым числом,
+                  если strategy неизвестна либо для стратегии "recurrence" не задан простой mod,
+                  если workers задан и не является положительным целым числом
+                  либо задан для стратегии, которая не строит таблицу в пуле процессов,
+                  если cache задан вместе со стратегией, не использующей таблицу переходов.
+      ImportError: Если выбрана стратегия "numpy", а NumPy не установлен.
     """
-    # Проверка корректности входных данных
-    if not (isinstance(M, int) and isinstance(N, int)):
-        raise ValueError("M and N must be integers")
-    if M < 1 or N < 1:
-        raise ValueError("M and N must be positive integers")
-    if M * N > 30:
-        raise ValueError("Product of M and N must not exceed 30")
+    rows, cols = normalize_size(M, N, mod)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy!r}")
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        raise ValueError("workers must be a positive integer")
+    if workers is not None and (strategy not in WORKER_STRATEGIES or cache is not None):
+        raise ValueError(f"workers is only supported by strategies {WORKER_STRATEGIES} without cache")
+    if cache is not None:
+        if strategy not in CACHE_STRATEGIES:
+            raise ValueError(f"strategy {strategy!r} cannot use the pattern cache")
+        return cache.count(M, N, mod)
+    # Берлекэмп–Мэсси делит на невязки, поэтому по составному модулю даёт неверные ответы.
+    if strategy == "recurrence" and (mod is None or not is_prime(mod)):
+        raise ValueError("strategy 'recurrence' requires a prime mod")
 
-    # Определяем число строк и столбцов:
-    # больший размер будем считать числом строк, меньший – числом столбцов.
-    rows: int = max(M, N)
-    cols: int = min(M, N)
+    if strategy == "auto":
+        strategy = "profile" if cols >= PROFILE_MIN_WIDTH else "symmetric"
 
-    total_masks: int = 2 ** cols  # общее число состояний строки
     if rows == 1:
-        return total_masks
+        result: int = 2 ** cols
+    elif strategy == "matrix":
+        result = _count_matrix_power(rows, cols, mod)
+    elif strategy == "profile":
+        result = _count_broken_profile(rows, cols, mod)
+    elif strategy == "symmetric":
+        result = _count_symmetric_dp(rows, cols, mod)
+    elif strategy == "numpy":
+        result = _count_numpy_dp(rows, cols, mod, workers)
+    elif strategy == "recurrence":
+        result = _count_recurrence(rows, cols, mod)
+    else:
+        result = _count_row_dp(rows, cols, mod, workers)
 
-    # Генерируем список всех состояний строки.
-    states: List[int] = list(range(total_masks))
+    return result % mod if mod is not None else result
 
-    # Предварительно вычисляем допустимые переходы между двумя соседними строками.
-    valid_transitions: Dict[int, List[int]] = {
-        mask: [mask2 for mask2 in states if is_valid_transition(mask, mask2, cols)]
-        for mask in states
-    }
 
-    # Инициализируем динамическое программирование:
-    # dp_prev[mask] хранит количество способов получить раскраску mask для предыдущей строки.
-    dp_prev: List[int] = [1] * total_masks
+def check_exact_printable(M: int, N: int) -> None:
+    """
+    Проверяет до подсчёта, что точный ответ для двора M×N можно записать в десятичном виде.
+    Узоров не больше 2^(M·N), поэтому в ответе не больше M·N·lg 2 + 1 цифр.
 
-    # Итеративно обрабатываем каждую последующую строку.
-    for _ in range(1, rows):
-        dp_curr: List[int] = [0] * total_masks
-        for mask1 in states:
-            ways = dp_prev[mask1]
-            if ways:
-                for mask2 in valid_transitions[mask1]:
-                    dp_curr[mask2] += ways
-        dp_prev = dp_curr
+    Генерирует:
+      ValueError: Если ответ может превысить MAX_EXACT_DIGITS цифр.
+    """
+    if MAX_EXACT_DIGITS and M * N * math.log10(2) + 1 > MAX_EXACT_DIGITS:
+        raise ValueError(f"Exact answer for {M}x{N} may exceed {MAX_EXACT_DIGITS} digits; "
+                         f"use count_pretty_patterns(M, N, mod=...) for such sizes")
 
-    return sum(dp_prev)
+
+def write_output(path: str, text: str) -> None:
+    """Атомарно записывает текст в файл: сначала во временный файл, затем переименование."""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 @time_memory_decorator
-def file_io() -> None:
+def file_io(input_path: str = "txt/input.txt", output_path: str = "txt/output.txt",
+            cache_dir: Optional[str] = None) -> None:
     """
     Обрабатывает файлы:
-      - Читает входные данные из файла txt/input.txt.
-      - Вызывает функцию count_pretty_patterns для вычисления результата.
-      - Записывает результат в файл txt/output.txt.
+      - Читает входные данные из файла input_path: одну или несколько пар M N.
+      - Вызывает count_pretty_patterns_batch для вычисления точных результатов
+        (через PatternCache в каталоге cache_dir, если он задан).
+      - Записывает результаты в файл output_path, по одному в строке.
+    Все ответы вычисляются и переводятся в строки до записи, а файл результата заменяется
+    атомарно (write_output), поэтому при ошибке прежний файл результата не портится.
+
+    Генерирует:
+      ValueError: Если входные данные некорректны или точный ответ слишком длинный
+                  (см. check_exact_printable).
     """
-    with open("txt/input.txt", "r") as f:
+    with open(input_path, "r") as f:
         parts = f.read().strip().split()
-        M, N = int(parts[0]), int(parts[1])
+    if len(parts) < 2 or len(parts) % 2:
+        raise ValueError("Input must contain pairs of integers M N")
+    sizes: List[Tuple[int, int]] = [(int(parts[i]), int(parts[i + 1])) for i in range(0, len(parts), 2)]
+    for M, N in sizes:
+        normalize_size(M, N)
+        check_exact_printable(M, N)
 
-    result: int = count_pretty_patterns(M, N)
+    cache = None
+    if cache_dir is not None:
+        from lab1.cache import PatternCache  # cache.py импортирует этот модуль.
+        cache = PatternCache(cache_dir)
+    results: List[int] = count_pretty_patterns_batch(sizes, cache=cache)
+    text: str = "\n".join(map(str, results))
 
-    with open("txt/output.txt", "w") as f:
-        f.write(str(result))
+    write_output(output_path, text)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+recurrence.py
+
+Линейные рекуррентные последовательности по простому модулю:
+восстановление соотношения алгоритмом Берлекэмпа–Мэсси и вычисление
+n-го члена методом Китамасы (возведение x в степень по модулю
+характеристического многочлена).
+"""
+
+from typing import List, Sequence
+
+# Основания теста Миллера–Рабина: первые 12 простых чисел. Для n < 3.3·10^24 такой набор
+# даёт детерминированный ответ (для больших n составное число проходит его лишь теоретически).
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def is_prime(n: int) -> bool:
+    """
+    Проверяет простоту n тестом Миллера–Рабина с основаниями MILLER_RABIN_BASES.
+
+    Параметры:
+      n (int): Проверяемое число.
+
+    Возвращает:
+      bool: True, если n простое.
+    """
+    if n < 2:
+        return False
+    for base in MILLER_RABIN_BASES:
+        if n % base == 0:
+            return n == base
+
+    # n − 1 = d · 2^s, d нечётно.
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for base in MILLER_RABIN_BASES:
+        x = pow(base, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False  # base – свидетель того, что n составное.
+    return True
+
+
+def berlekamp_massey(sequence: Sequence[int], mod: int) -> List[int]:
+    """
+    Находит кратчайшее соотношение a[n] = c[0]·a[n-1] + c[1]·a[n-2] + ... + c[d-1]·a[n-d] (mod p),
+    которому удовлетворяет последовательность. Для соотношения порядка d достаточно 2·d членов.
+
+    Параметры:
+      sequence (Sequence[int]): Первые члены последовательности.
+      mod (int): Простой модуль.
+
+    Возвращает:
+      List[int]: Коэффициенты c[0], ..., c[d-1] (пустой список для нулевой последовательности).
+    """
+    current: List[int] = []   # Текущее соотношение.
+    previous: List[int] = []  # Соотношение до последнего увеличения длины.
+    previous_index: int = -1  # Номер члена, на котором previous перестало подходить.
+    previous_delta: int = 0   # Невязка previous на этом члене.
+
+    for i, value in enumerate(sequence):
+        predicted = sum(c * sequence[i - 1 - j] for j, c in enumerate(current)) % mod
+        delta = (value - predicted) % mod
+        if delta == 0:
+            continue  # Текущее соотношение верно и для этого члена.
+        if previous_index == -1:
+            # Первый ненулевой член: подходит любое соотношение длины i + 1.
+            current, previous_index, previous_delta = [0] * (i + 1), i, delta
+            continue
+
+        # Поправка current − k·x^(i − previous_index)·previous убирает невязку на члене i.
+        k = delta * pow(previous_delta, -1, mod) % mod
+        corrected = [0] * (i - previous_index - 1) + [k] + [(-k * c) % mod for c in previous]
+        corrected += [0] * (len(current) - len(corrected))
+        for j, c in enumerate(current):
+            corrected[j] = (corrected[j] + c) % mod
+
+        if i - previous_index + len(previous) >= len(current):
+            previous, previous_index, previous_delta = current, i, delta
+        current = corrected
+
+    return current
+
+
+def _mul_mod_characteristic(a: List[int], b: List[int], coefficients: List[int], mod: int) -> List[int]:
+    """Перемножает многочлены степени < d и приводит результат по модулю x^d − c[0]·x^(d−1) − ... − c[d−1]."""
+    d = len(coefficients)
+    product = [0] * (2 * d - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                product[i + j] += x * y
+    # Старшие степени заменяем по соотношению: x^k = c[0]·x^(k−1) + ... + c[d−1]·x^(k−d).
+    for k in range(2 * d - 2, d - 1, -1):
+        top = product[k] % mod
+        if top:
+            for j, c in enumerate(coefficients):
+                product[k - 1 - j] += top * c
+    return [value % mod for value in product[:d]]
+
+
+def linear_recurrence_term(coefficients: List[int], initial: Sequence[int], n: int, mod: int) -> int:
+    """
+    Вычисляет член a[n] последовательности, заданной соотношением и первыми членами,
+    методом Китамасы: O(d² · log n), где d – порядок соотношения.
+
+    Параметры:
+      coefficients (List[int]): Коэффициенты соотношения (как возвращает berlekamp_massey).
+      initial (Sequence[int]): Члены a[0], ..., a[d−1] (можно больше).
+      n (int): Номер искомого члена (с нуля).
+      mod (int): Модуль.
+
+    Возвращает:
+      int: a[n] по модулю mod.
+    """
+    d = len(coefficients)
+    if n < len(initial):
+        return initial[n] % mod
+    if d == 0:
+        return 0
+
+    # Остаток x^n по модулю характеристического многочлена, бинарным возведением в степень.
+    result: List[int] = [1] + [0] * (d - 1)
+    base: List[int] = [0, 1] + [0] * (d - 2) if d > 1 else [coefficients[0] % mod]
+    while n:
+        if n & 1:
+            result = _mul_mod_characteristic(result, base, coefficients, mod)
+        n >>= 1
+        if n:
+            base = _mul_mod_characteristic(base, base, coefficients, mod)
+
+    # x^n ≡ Σ r[i]·x^i, значит a[n] = Σ r[i]·a[i].
+    return sum(r * a for r, a in zip(result, initial)) % mod
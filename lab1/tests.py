@@ -1,5 +1,21 @@
+import io
+import os
+import tempfile
 import unittest
-from lab1.main import count_pretty_patterns
+from contextlib import redirect_stdout
+from itertools import product
+from unittest import mock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lab1.automaton import ColouringRule, compile_rule, count_patterns
+from lab1.cache import PatternCache
+from lab1.recurrence import berlekamp_massey, is_prime, linear_recurrence_term
+from lab1.main import (build_transitions, build_transitions_csr, count_pretty_patterns, count_pretty_patterns_batch,
+                       CACHE_STRATEGIES, PROFILE_MIN_WIDTH, file_io, is_valid_transition, iter_pattern_counts, symmetry_classes, valid_successors)
 
 
 class TestCountPrettyPatterns(unittest.TestCase):
@@ -20,10 +36,11 @@ class TestCountPrettyPatterns(unittest.TestCase):
         self.assertEqual(count_pretty_patterns(1, 1), 2)
 
     def test_extreme(self):
-        """Крайний допустимый случай: произведение сторон равно 30 (например, 5×6)."""
+        """Большие дворы: прежний предел M·N ≤ 30 (5×6) снят, считаются и дворы далеко за ним."""
         result = count_pretty_patterns(5, 6)
         self.assertIsInstance(result, int)
         self.assertGreater(result, 0)
+        self.assertGreater(count_pretty_patterns(12, 12), result)
 
     def test_error(self):
         """Ошибочные ситуации: передача некорректных значений."""
@@ -33,10 +50,358 @@ class TestCountPrettyPatterns(unittest.TestCase):
             count_pretty_patterns(5, 0)
         with self.assertRaises(ValueError):
             count_pretty_patterns(-1, 5)
-        with self.assertRaises(ValueError):
-            count_pretty_patterns(4, 8)  # 4×8 = 32, что больше допустимого значения 30
         with self.assertRaises(ValueError):
             count_pretty_patterns(2.5, 3)  # нецелое число
+        with self.assertRaises(ValueError):
+            count_pretty_patterns(3, 3, mod=0)  # модуль должен быть положительным
+        with self.assertRaises(ValueError):
+            count_pretty_patterns(3, 3, strategy="unknown")
+
+    def test_matrix_strategy(self):
+        """Возведение матрицы в степень совпадает с построчной динамикой."""
+        for M in range(1, 5):
+            for N in range(1, 7):
+                self.assertEqual(count_pretty_patterns(M, N, strategy="matrix"),
+                                 count_pretty_patterns(M, N))
+        # Ограничение M*N ≤ 30 снято: 4×8 = 32 клетки.
+        self.assertEqual(count_pretty_patterns(4, 8, strategy="matrix"), count_pretty_patterns(4, 8))
+
+    def test_profile_strategy(self):
+        """Динамика по изломанному профилю совпадает с построчной динамикой."""
+        for M in range(1, 6):
+            for N in range(1, 8):
+                self.assertEqual(count_pretty_patterns(M, N, strategy="profile"),
+                                 count_pretty_patterns(M, N, strategy="dp"))
+        self.assertEqual(count_pretty_patterns(9, 10, strategy="profile", mod=10 ** 9 + 7),
+                         count_pretty_patterns(9, 10, strategy="dp", mod=10 ** 9 + 7))
+
+    def test_auto_strategy_choice(self):
+        """"auto" выбирает "symmetric" до ширины PROFILE_MIN_WIDTH и "profile" начиная с неё."""
+        self.assertEqual(PROFILE_MIN_WIDTH, 11)
+        for cols, engine in ((10, "_count_symmetric_dp"), (11, "_count_broken_profile")):
+            with mock.patch(f"lab1.main.{engine}", return_value=7) as chosen:
+                self.assertEqual(count_pretty_patterns(cols + 2, cols), 7)
+                chosen.assert_called_once_with(cols + 2, cols, None)
+
+    def test_symmetric_strategy(self):
+        """Динамика по классам симметрии совпадает с построчной динамикой."""
+        for M in range(1, 6):
+            for N in range(1, 9):
+                self.assertEqual(count_pretty_patterns(M, N, strategy="symmetric"),
+                                 count_pretty_patterns(M, N, strategy="dp"))
+        representatives, class_of, class_sizes = symmetry_classes(6)
+        self.assertEqual(sum(class_sizes), 2 ** 6)
+        self.assertEqual([class_of[mask] for mask in representatives], list(range(len(representatives))))
+
+    @unittest.skipIf(numpy is None, "NumPy не установлен")
+    def test_numpy_strategy(self):
+        """Векторизованная динамика: uint64, переход к точным числам и вычисления по модулю."""
+        for M in range(1, 6):
+            for N in range(1, 8):
+                self.assertEqual(count_pretty_patterns(M, N, strategy="numpy"),
+                                 count_pretty_patterns(M, N, strategy="dp"))
+        # Для 3×200 ответ не помещается в uint64.
+        self.assertEqual(count_pretty_patterns(3, 200, strategy="numpy"), count_pretty_patterns(3, 200))
+        for mod in (10 ** 9 + 7, 2 ** 62 + 1):
+            self.assertEqual(count_pretty_patterns(4, 50, strategy="numpy", mod=mod),
+                             count_pretty_patterns(4, 50, mod=mod))
+
+    def test_batch(self):
+        """Пакетные запросы совпадают с одиночными и сохраняют порядок."""
+        sizes = [(3, 7), (7, 3), (2, 2), (3, 1), (1, 1), (5, 6), (3, 3), (10, 11)]
+        expected = [count_pretty_patterns(M, N) for M, N in sizes]
+        self.assertEqual(count_pretty_patterns_batch(sizes), expected)
+        self.assertEqual(count_pretty_patterns_batch(sizes, mod=1000), [value % 1000 for value in expected])
+        self.assertEqual(count_pretty_patterns_batch([]), [])
+        with self.assertRaises(ValueError):
+            count_pretty_patterns_batch([(2, 2), (0, 3)])
+
+    def test_file_io(self):
+        """file_io пишет ответы по одному в строке, а слишком длинные точные ответы отклоняет до записи."""
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path, output_path = os.path.join(tmp, "input.txt"), os.path.join(tmp, "output.txt")
+            with open(input_path, "w") as f:
+                f.write("1 11\n3 3\n")
+            with redirect_stdout(io.StringIO()):
+                file_io(input_path, output_path)
+            with open(output_path) as f:
+                self.assertEqual(f.read(), f"{count_pretty_patterns(1, 11)}\n{count_pretty_patterns(3, 3)}")
+
+            for bad_input in ("4 8000", "5 5000000000000000000", "2 2 0 3"):
+                with open(input_path, "w") as f:
+                    f.write(bad_input)
+                with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+                    file_io(input_path, output_path)
+                with open(output_path) as f:  # Прежний результат не испорчен.
+                    self.assertEqual(f.read(), f"{count_pretty_patterns(1, 11)}\n{count_pretty_patterns(3, 3)}")
+
+            # Ошибка подсчёта посреди пакета тоже не портит прежний файл.
+            with open(input_path, "w") as f:
+                f.write("2 2 3 3")
+            with mock.patch("lab1.main.count_pretty_patterns_batch", side_effect=MemoryError), \
+                    redirect_stdout(io.StringIO()), self.assertRaises(MemoryError):
+                file_io(input_path, output_path)
+            with open(output_path) as f:
+                self.assertEqual(f.read(), f"{count_pretty_patterns(1, 11)}\n{count_pretty_patterns(3, 3)}")
+            self.assertEqual(sorted(os.listdir(tmp)), ["input.txt", "output.txt"])
+
+    def test_iter_pattern_counts(self):
+        """Промежуточные ответы одной динамики – ответы для всех rows подряд."""
+        counts = iter_pattern_counts(3)
+        self.assertEqual([next(counts) for _ in range(6)], [count_pretty_patterns(3, rows) for rows in range(1, 7)])
+
+    def test_recurrence_strategy(self):
+        """Берлекэмп–Мэсси + Китамаса совпадает с динамикой и работает для огромных rows."""
+        mod = 10 ** 9 + 7
+        for M in range(1, 7):
+            for N in range(1, 30):
+                self.assertEqual(count_pretty_patterns(M, N, strategy="recurrence", mod=mod),
+                                 count_pretty_patterns(M, N, mod=mod))
+        self.assertEqual(count_pretty_patterns(5, 5 * 10 ** 18, strategy="recurrence", mod=mod),
+                         count_pretty_patterns(5, 5 * 10 ** 18, strategy="matrix", mod=mod))
+        # Нужен простой модуль; составной отклоняется даже при rows = 1.
+        for bad_mod in (None, 1, 10 ** 9, 561, 3215031751, 2 ** 61 + 1):
+            with self.assertRaises(ValueError) as error:
+                count_pretty_patterns(3, 3, strategy="recurrence", mod=bad_mod)
+            self.assertEqual(str(error.exception), "strategy 'recurrence' requires a prime mod")
+        with self.assertRaises(ValueError):
+            count_pretty_patterns(1, 3, strategy="recurrence", mod=12)
+        self.assertEqual(count_pretty_patterns(4, 30, strategy="recurrence", mod=2 ** 61 - 1),
+                         count_pretty_patterns(4, 30, mod=2 ** 61 - 1))
+
+    def test_is_prime(self):
+        """Миллер–Рабин совпадает с перебором делителей и не обманывается числами Кармайкла."""
+        def trial_division(n):
+            return n >= 2 and all(n % d for d in range(2, int(n ** 0.5) + 1))
+        self.assertEqual([n for n in range(2000) if is_prime(n)], [n for n in range(2000) if trial_division(n)])
+        # Числа Кармайкла и сильные псевдопростые по нескольким первым основаниям.
+        for composite in (561, 41041, 3215031751, 3825123056546413051, (2 ** 61 - 1) * (2 ** 31 - 1)):
+            self.assertFalse(is_prime(composite))
+        for prime in (10 ** 9 + 7, 998244353, 2 ** 61 - 1, 2 ** 89 - 1):
+            self.assertTrue(is_prime(prime))
+
+    def test_berlekamp_massey(self):
+        """Восстановление соотношения Фибоначчи и вычисление далёкого члена."""
+        mod = 10 ** 9 + 7
+        fibonacci = [0, 1]
+        for _ in range(100):
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        coefficients = berlekamp_massey(fibonacci[:8], mod)
+        self.assertEqual(coefficients, [1, 1])
+        self.assertEqual(linear_recurrence_term(coefficients, fibonacci[:2], 100, mod), fibonacci[100] % mod)
+        self.assertEqual(berlekamp_massey([0, 0, 0], mod), [])
+        self.assertEqual(linear_recurrence_term([], [0], 10, mod), 0)
+
+    def test_valid_successors(self):
+        """Перечисление переходов совпадает с попарной проверкой всех масок."""
+        for cols in range(1, 7):
+            for mask1 in range(2 ** cols):
+                expected = [mask2 for mask2 in range(2 ** cols) if is_valid_transition(mask1, mask2, cols)]
+                self.assertEqual(sorted(valid_successors(mask1, cols)), expected)
+
+    def test_parallel_csr_transitions(self):
+        """Таблица CSR из пула процессов совпадает со списками переходов."""
+        for cols in range(1, 7):
+            table = build_transitions_csr(cols, workers=2)
+            self.assertEqual(len(table), 2 ** cols)
+            self.assertEqual([list(table[mask]) for mask in range(len(table))], build_transitions(cols))
+        self.assertEqual(count_pretty_patterns(4, 9, strategy="dp", workers=2), count_pretty_patterns(4, 9))
+        # None и 1 означают одно и то же: таблица строится в текущем процессе, без пула.
+        self.assertEqual(list(build_transitions_csr(4).targets), list(build_transitions_csr(4, workers=1).targets))
+        with self.assertRaises(ValueError):
+            build_transitions_csr(3, workers=0)
+        # Неположительное число процессов отклоняется одинаково во всех стратегиях, даже при rows = 1.
+        for strategy in ("dp", "numpy"):
+            for workers in (0, -2):
+                with self.assertRaises(ValueError):
+                    count_pretty_patterns(4, 9, strategy=strategy, workers=workers)
+            with self.assertRaises(ValueError):
+                count_pretty_patterns(1, 3, strategy=strategy, workers=0)
+        # Стратегии без таблицы переходов и кэш не принимают workers, а не игнорируют его молча.
+        for strategy in ("auto", "matrix", "profile", "symmetric", "recurrence"):
+            with self.assertRaises(ValueError):
+                count_pretty_patterns(4, 9, strategy=strategy, mod=101, workers=2)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with self.assertRaises(ValueError):
+                count_pretty_patterns(4, 9, strategy="dp", workers=2, cache=PatternCache(cache_dir))
+
+    def test_modular(self):
+        """Вычисления по модулю, в том числе для огромной длинной стороны."""
+        mod = 10 ** 9 + 7
+        self.assertEqual(count_pretty_patterns(5, 6, mod=mod), count_pretty_patterns(5, 6) % mod)
+        self.assertEqual(count_pretty_patterns(5, 6, strategy="matrix", mod=1000),
+                         count_pretty_patterns(5, 6) % 1000)
+        result = count_pretty_patterns(5, 5 * 10 ** 18, strategy="matrix", mod=mod)
+        self.assertTrue(0 <= result < mod)
+
+
+class TestPatternCache(unittest.TestCase):
+    def test_resume_from_prefix(self):
+        """Кэш совпадает с прямым подсчётом и продолжает динамику с сохранённых префиксов."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir)
+            for rows in (4, 6, 5, 12, 9):
+                self.assertEqual(cache.count(4, rows), count_pretty_patterns(4, rows))
+                self.assertEqual(cache.count(rows, 4, mod=97), count_pretty_patterns(4, rows, mod=97))
+            # Вектор сохраняется, только когда запрос продлевает самый длинный префикс.
+            self.assertEqual(cache.checkpoint_rows(4), [4, 6, 12])
+
+            # Новый экземпляр читает таблицу переходов и префиксы с диска.
+            reopened = PatternCache(cache_dir)
+            self.assertIsInstance(reopened.transitions(4).offsets, memoryview)
+            self.assertEqual(reopened.checkpoint_rows(4), [4, 6, 12])
+            self.assertEqual(reopened.count(4, 20), count_pretty_patterns(4, 20))
+
+    def test_limits(self):
+        """Вытеснение таблиц из памяти и ограничение числа сохранённых векторов."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir, max_tables=1, max_checkpoints=2)
+            for rows in (2, 4, 6):
+                cache.count(3, rows)
+            self.assertEqual(cache.checkpoint_rows(3), [4, 6])
+            cache.transitions(2)
+            self.assertEqual(cache.count(3, 7), count_pretty_patterns(3, 7))
+            with self.assertRaises(ValueError):
+                PatternCache(cache_dir, max_tables=0)
+            with self.assertRaises(ValueError):
+                PatternCache(cache_dir, max_answers=0)
+
+    def test_answer_journal(self):
+        """Ответы ограничены max_answers, а журнал на диске не растёт без предела."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir, max_checkpoints=1, max_answers=3)
+            for rows in range(1, 21):
+                self.assertEqual(cache.count(2, rows, mod=1009), count_pretty_patterns(2, rows, mod=1009))
+            self.assertEqual(list(cache._load_answers(2, 1009)), [18, 19, 20])
+            self.assertLessEqual(cache._journal_records[(2, 1009)], 6)
+
+            # Недописанная последняя запись журнала отбрасывается при чтении.
+            with open(cache._answers_path(2, 1009), "ab") as f:
+                f.write(b"\x15\x00\x00")
+            reopened = PatternCache(cache_dir, max_answers=3)
+            self.assertEqual(list(reopened._load_answers(2, 1009)), [18, 19, 20])
+            self.assertEqual(reopened.count(2, 21, mod=1009), count_pretty_patterns(2, 21, mod=1009))
+            self.assertEqual(list(PatternCache(cache_dir, max_answers=3)._load_answers(2, 1009)), [19, 20, 21])
+
+    def test_huge_exact_and_failed_write(self):
+        """Точные ответы длиннее лимита перевода в строку сохраняются; ошибка записи не портит кэш."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir)
+            huge = cache.count(4, 8000)
+            self.assertGreater(huge.bit_length(), 4 * 8000 // 2)
+            self.assertEqual(cache.count(4, 11), count_pretty_patterns(4, 11))
+            self.assertEqual(PatternCache(cache_dir).count(4, 8000), huge)
+
+            # Запрос продлевает префикс, поэтому записывает вектор динамики – и запись падает.
+            with mock.patch("lab1.cache.os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    cache.count(4, 8001)
+            self.assertNotIn(8001, cache.checkpoint_rows(4))
+            self.assertNotIn(8001, cache._load_answers(4, None))
+            self.assertFalse([name for name in os.listdir(cache_dir) if name.endswith(".tmp")])
+            self.assertEqual(cache.count(4, 8001), count_pretty_patterns(4, 8001))
+
+    def test_damaged_table_file(self):
+        """Файл таблицы неправильной длины не читается, а строится заново."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            PatternCache(cache_dir).transitions(3)
+            path = os.path.join(cache_dir, "transitions_3.bin")
+            with open(path, "rb") as f:
+                original = f.read()
+            # Длина не кратна 4, лишнее слово после targets, обрезанный массив offsets.
+            # Последнее слово – target, равный 2^cols: маска шире двора.
+            too_wide = original[:-4] + (8).to_bytes(4, "little")
+            for damaged in (original + b"\x01", original + b"\x00" * 4, original[:8], too_wide):
+                with open(path, "wb") as f:
+                    f.write(damaged)
+                self.assertIsNone(PatternCache(cache_dir)._load_table(3))
+            self.assertEqual(PatternCache(cache_dir).count(3, 5), count_pretty_patterns(3, 5))
+
+    def test_damaged_vector_files(self):
+        """Испорченные векторы динамики отбрасываются, а не исполняются и не ломают подсчёт."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir)
+            cache.count(3, 6, mod=97)
+            cache.count(3, 6)
+            for name in ("dp_3_97_6.bin", "dp_3_exact_6.bin"):
+                with open(os.path.join(cache_dir, name), "wb") as f:
+                    f.write(b"\xff" * 64)
+            reopened = PatternCache(cache_dir)
+            self.assertEqual(reopened.count(3, 9, mod=97), count_pretty_patterns(3, 9, mod=97))
+            self.assertEqual(reopened.count(3, 9), count_pretty_patterns(3, 9))
+            self.assertEqual(reopened.checkpoint_rows(3), [9])
+
+    def test_count_pretty_patterns_with_cache(self):
+        """count_pretty_patterns, пакетный режим и file_io принимают кэш по желанию."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PatternCache(cache_dir)
+            for strategy in CACHE_STRATEGIES:
+                self.assertEqual(count_pretty_patterns(5, 7, strategy=strategy, cache=cache),
+                                 count_pretty_patterns(5, 7))
+            self.assertEqual(cache.checkpoint_rows(5), [7])
+            with self.assertRaises(ValueError):
+                count_pretty_patterns(5, 7, strategy="matrix", cache=cache)
+
+            sizes = [(4, 9), (3, 2), (4, 5), (9, 4), (1, 1)]
+            self.assertEqual(count_pretty_patterns_batch(sizes, mod=101, cache=cache),
+                             count_pretty_patterns_batch(sizes, mod=101))
+            self.assertEqual(cache.checkpoint_rows(4, 101), [5, 9])
+
+            input_path = os.path.join(cache_dir, "input.txt")
+            output_path = os.path.join(cache_dir, "output.txt")
+            with open(input_path, "w") as f:
+                f.write("3 4\n6 3\n")
+            with redirect_stdout(io.StringIO()):
+                file_io(input_path, output_path, cache_dir=cache_dir)
+            with open(output_path) as f:
+                self.assertEqual(f.read().split(), [str(count_pretty_patterns(3, 4)),
+                                                    str(count_pretty_patterns(3, 6))])
+            self.assertEqual(PatternCache(cache_dir).checkpoint_rows(3), [4, 6])
+
+
+def brute_force_patterns(M: int, N: int, rule: ColouringRule) -> int:
+    """Полный перебор раскрасок M×N для проверки автомата на маленьких дворах."""
+    total = 0
+    for cells in product(range(rule.colours), repeat=M * N):
+        grid = [cells[i * N:(i + 1) * N] for i in range(M)]
+        total += not any(
+            len({grid[i + x][j + y] for x in range(rule.block_height) for y in range(rule.block_width)}) == 1
+            for i in range(M - rule.block_height + 1)
+            for j in range(N - rule.block_width + 1)
+        )
+    return total
+
+
+class TestColouringAutomaton(unittest.TestCase):
+    def test_default_rule(self):
+        """Правило по умолчанию (2 цвета, 2×2) даёт ответы исходной задачи."""
+        for M in range(1, 5):
+            for N in range(1, 6):
+                self.assertEqual(count_patterns(M, N), count_pretty_patterns(M, N))
+                self.assertEqual(count_patterns(M, N, strategy="matrix", mod=7), count_pretty_patterns(M, N) % 7)
+
+    def test_general_rules(self):
+        """k цветов и прямоугольники a×b сверяются с полным перебором."""
+        for rule in (ColouringRule(3, 2, 2), ColouringRule(2, 2, 3), ColouringRule(2, 3, 2),
+                     ColouringRule(3, 1, 2), ColouringRule(2, 3, 3), ColouringRule(2, 1, 1)):
+            for M in range(1, 4):
+                for N in range(1, 4):
+                    if rule.colours ** (M * N) <= 20000:
+                        self.assertEqual(count_patterns(M, N, rule), brute_force_patterns(M, N, rule))
+
+    def test_minimisation(self):
+        """Минимизация склеивает состояния, отличающиеся перестановкой цветов и отражением."""
+        automaton = compile_rule(ColouringRule(), 8)
+        self.assertLess(automaton.size, automaton.raw_states // 3)
+        # Состояния склеиваются по симметриям уже при обходе, а raw_states считает все орбиты.
+        automaton = compile_rule(ColouringRule(), 11)
+        self.assertEqual((automaton.raw_states, automaton.size), (2047, 528))
+        self.assertEqual(count_patterns(11, 11, mod=10 ** 9 + 7), count_pretty_patterns(11, 11, mod=10 ** 9 + 7))
+        self.assertEqual(compile_rule(ColouringRule(4, 2, 2), 5).raw_states, 105)
+        with self.assertRaises(ValueError):
+            compile_rule(ColouringRule(colours=0), 3)
+        with self.assertRaises(ValueError):
+            count_patterns(3, 3, strategy="profile")
 
 
 if __name__ == '__main__':
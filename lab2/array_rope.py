@@ -0,0 +1,173 @@
+from array import array
+from typing import List, Tuple
+
+
+# Класс ArrayRope – splay-дерево (rope) в виде структуры массивов: узел – это номер в параллельных
+# массивах left/right/parent/size типа array('i'), а не отдельный объект Python. Номер 0 означает
+# "нет узла" (size[0] = 0), узел i хранит символ text[i - 1]. Запросы только перевешивают узлы,
+# поэтому символы не копируются, а снимок всего дерева – это копия четырех буферов.
+class ArrayRope:
+    __slots__ = ['text', 'left', 'right', 'parent', 'size', 'root']
+
+    def __init__(self, s: str = "") -> None:
+        n = len(s)
+        zeros = bytes(array('i').itemsize * (n + 1))
+        self.text: str = s                 # Символы узлов в исходном порядке.
+        self.left: array = array('i', zeros)    # Номер левого ребенка.
+        self.right: array = array('i', zeros)   # Номер правого ребенка.
+        self.parent: array = array('i', zeros)  # Номер родителя.
+        self.size: array = array('i', [1]) * (n + 1)  # Размер поддерева (у листьев – 1).
+        self.size[0] = 0
+        self.root: int = self._build(n)
+
+    # Метод _build строит сбалансированное дерево за O(n) без рекурсии, как build_rope в main.py:
+    # высота узла i – число нулевых младших битов i, поддерево покрывает [i - 2^h + 1, i + 2^h - 1].
+    def _build(self, n: int) -> int:
+        if n == 0:
+            return 0
+        left, right, parent, size = self.left, self.right, self.parent, self.size
+        for i in range(2, n + 1, 2):  # Нечётные номера – листья, их размер уже выставлен.
+            low = i & -i
+            size[i] = min(i + low - 1, n) - i + low
+            half = low >> 1
+            left[i] = i - half
+            parent[i - half] = i
+            j = i + half
+            while j > n and half > 1:
+                # Правого ребенка нет в строке: спускаемся к его левому ребенку.
+                half >>= 1
+                j -= half
+            if j <= n:
+                right[i] = j
+                parent[j] = i
+        return 1 << (n.bit_length() - 1)
+
+    # Метод snapshot возвращает независимую копию дерева: четыре копии буферов и общий текст.
+    def snapshot(self) -> 'ArrayRope':
+        copy = ArrayRope.__new__(ArrayRope)
+        copy.text = self.text
+        copy.left = self.left[:]
+        copy.right = self.right[:]
+        copy.parent = self.parent[:]
+        copy.size = self.size[:]
+        copy.root = self.root
+        return copy
+
+    # Метод _update пересчитывает размер поддерева узла x.
+    def _update(self, x: int) -> None:
+        self.size[x] = self.size[self.left[x]] + self.size[self.right[x]] + 1
+
+    # Метод _rotate выполняет поворот узла x относительно его родителя.
+    def _rotate(self, x: int) -> None:
+        left, right, parent, size = self.left, self.right, self.parent, self.size
+        p = parent[x]
+        g = parent[p]
+        if left[p] == x:
+            b = right[x]
+            left[p] = b
+            right[x] = p
+        else:
+            b = left[x]
+            right[p] = b
+            left[x] = p
+        if b:
+            parent[b] = p
+        parent[p] = x
+        parent[x] = g
+        if g:
+            if left[g] == p:
+                left[g] = x
+            else:
+                right[g] = x
+        size[p] = size[left[p]] + size[right[p]] + 1
+        size[x] = size[left[x]] + size[right[x]] + 1
+
+    # Метод splay поднимает узел x до корня его дерева (zig, zig-zig, zig-zag).
+    def splay(self, x: int) -> int:
+        left, parent = self.left, self.parent
+        while parent[x]:
+            p = parent[x]
+            g = parent[p]
+            if g:
+                if (left[g] == p) == (left[p] == x):
+                    self._rotate(p)
+                else:
+                    self._rotate(x)
+            self._rotate(x)
+        return x
+
+    # Метод merge объединяет деревья с корнями a и b (все узлы a идут до узлов b).
+    def merge(self, a: int, b: int) -> int:
+        if not a:
+            return b
+        if not b:
+            return a
+        right = self.right
+        while right[a]:
+            a = right[a]
+        a = self.splay(a)
+        right[a] = b
+        self.parent[b] = a
+        self._update(a)
+        return a
+
+    # Метод split делит дерево с корнем root на первые index узлов и остальные.
+    def split(self, root: int, index: int) -> Tuple[int, int]:
+        if not root:
+            return 0, 0
+        left, right, size = self.left, self.right, self.size
+        if index < 0 or index > size[root]:
+            raise ValueError("Invalid split index")
+        if index == 0:
+            return 0, root
+        if index == size[root]:
+            return root, 0
+        cur = root
+        while True:
+            left_size = size[left[cur]]
+            if index < left_size:
+                cur = left[cur]
+            elif index > left_size:
+                index -= left_size + 1
+                cur = right[cur]
+            else:
+                break
+        root = self.splay(cur)
+        a = left[root]
+        self.parent[a] = 0
+        left[root] = 0
+        self._update(root)
+        return a, root
+
+    # Метод cut_and_paste вырезает S[i...j] и вставляет её после k-го символа оставшейся строки
+    # (те же проверки и ошибки, что у rope_cut_and_paste).
+    def cut_and_paste(self, i: int, j: int, k: int) -> None:
+        if i < 0 or j < 0 or k < 0:
+            raise ValueError("Indices must be non-negative")
+        if i > j:
+            raise ValueError("Invalid query: i must be <= j")
+        a, b = self.split(self.root, i)
+        if self.size[b] < j - i + 1:
+            raise ValueError("Invalid query: j is out of range")
+        c, d = self.split(b, j - i + 1)
+        merged = self.merge(a, d)
+        if k > self.size[merged]:
+            raise ValueError("Invalid query: k is out of range")
+        l, r = self.split(merged, k)
+        self.root = self.merge(self.merge(l, c), r)
+
+    # Метод traverse выполняет in-order обход и собирает итоговую строку.
+    def traverse(self) -> str:
+        left, right, text = self.left, self.right, self.text
+        result: List[str] = []
+        stack: List[int] = []
+        cur = self.root
+        while stack or cur:
+            if cur:
+                stack.append(cur)
+                cur = left[cur]
+            else:
+                cur = stack.pop()
+                result.append(text[cur - 1])
+                cur = right[cur]
+        return "".join(result)
@@ -0,0 +1,110 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from lab2.main import process_file
+from utils import measure_outcome
+
+# Задание пакетной обработки: путь к входному файлу и путь к файлу результата.
+FileJob = Tuple[str, str]
+
+
+# Класс JobStats – замеры одного задания: время и пиковая память в процессе-исполнителе,
+# а также текст ошибки, если задание не выполнено (остальные задания при этом продолжаются).
+class JobStats(NamedTuple):
+    input_path: str
+    elapsed: float
+    peak_memory: int
+    error: Optional[str] = None
+
+
+# Класс BatchReport – сводка пакетного запуска: замеры заданий в порядке заданий и общие показатели.
+class BatchReport(NamedTuple):
+    jobs: List[JobStats]
+    wall_time: float
+
+    @property
+    def total_time(self) -> float:
+        """Суммарное время заданий во всех процессах."""
+        return sum(job.elapsed for job in self.jobs)
+
+    @property
+    def peak_memory(self) -> int:
+        """Наибольшая пиковая память среди заданий."""
+        return max((job.peak_memory for job in self.jobs), default=0)
+
+    @property
+    def failed(self) -> List[JobStats]:
+        """Задания, завершившиеся ошибкой."""
+        return [job for job in self.jobs if job.error is not None]
+
+
+# Функция _run_chunk выполняется в процессе-исполнителе: обрабатывает часть заданий подряд и возвращает
+# их замеры. Любая ошибка задания (Exception) записывается в его замеры вместе со временем и памятью до
+# момента ошибки, и часть продолжается со следующего задания. Ничего не печатает, чтобы вывод процессов
+# не перемешивался.
+def _run_chunk(chunk: Sequence[FileJob]) -> List[JobStats]:
+    stats: List[JobStats] = []
+    for input_path, output_path in chunk:
+        _, error, elapsed, peak = measure_outcome(process_file, input_path, output_path)
+        message = None if error is None else f"{type(error).__name__}: {error}"
+        stats.append(JobStats(input_path, elapsed, peak, message))
+    return stats
+
+
+def run_batch(jobs: Sequence[FileJob], workers: Optional[int] = None, chunk_size: int = 64) -> BatchReport:
+    """
+    Выполняет независимые задания (входной файл -> файл результата) в пуле процессов.
+    Задания делятся на части по chunk_size, чтобы пересылка между процессами не стоила
+    дороже самой работы; результаты собираются в порядке заданий.
+
+    Параметры:
+      jobs (Sequence[FileJob]): Пары (входной файл, файл результата) в формате file_io.
+      workers (Optional[int]): Число процессов (None – по числу ядер, 1 – без пула).
+      chunk_size (int): Сколько заданий передаётся процессу за раз.
+
+    Возвращает:
+      BatchReport: Замеры каждого задания и сводка.
+
+    Генерирует:
+      ValueError: Если workers или chunk_size не положительны.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be positive integers")
+
+    chunks = [jobs[start:start + chunk_size] for start in range(0, len(jobs), chunk_size)]
+    stats: List[JobStats] = []
+    start_time = time.perf_counter()
+    if workers == 1 or len(chunks) <= 1:
+        for chunk_stats in map(_run_chunk, chunks):
+            stats.extend(chunk_stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_stats in pool.map(_run_chunk, chunks):  # Результаты приходят в порядке частей.
+                stats.extend(chunk_stats)
+    return BatchReport(stats, time.perf_counter() - start_time)
+
+
+# Функция batch_io обрабатывает все файлы *.txt из input_dir и пишет результаты в output_dir под теми же
+# именами, после чего печатает одну сводку по всем заданиям.
+def batch_io(input_dir: str = "txt/batch", output_dir: str = "txt/batch_output",
+             workers: Optional[int] = None, chunk_size: int = 64) -> BatchReport:
+    os.makedirs(output_dir, exist_ok=True)
+    names = sorted(name for name in os.listdir(input_dir) if name.endswith(".txt"))
+    jobs = [(os.path.join(input_dir, name), os.path.join(output_dir, name)) for name in names]
+    report = run_batch(jobs, workers, chunk_size)
+
+    print(f"Заданий: {len(report.jobs)}, с ошибками: {len(report.failed)}")
+    print(f"Общее время: {report.wall_time:.6f} секунд, суммарное время заданий: {report.total_time:.6f} секунд")
+    print(f"Пиковое использование памяти одним заданием: {report.peak_memory / 1024:.2f} КБ")
+    for job in report.failed:
+        print(f"{job.input_path}: {job.error}")
+    return report
+
+
+# Точка входа: пакетная обработка каталога txt/batch.
+if __name__ == "__main__":
+    batch_io()
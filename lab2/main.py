@@ -1,25 +1,57 @@
 from utils import time_memory_decorator
-from typing import Optional, Tuple, List
+import os
+import random
+from collections import deque
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 
+from lab2 import persistent
+from lab2.array_rope import ArrayRope
 
-# Класс Node представляет узел splay-дерева, который хранит один символ строки.
+# Запрос: (i, j, k) – вырезать S[i...j] и вставить после k-го символа, (i, j) – развернуть S[i...j].
+Query = Tuple[int, ...]
+
+# Полиномиальный хеш строки: H(c0 c1 ... c(m-1)) = c0·B^(m-1) + ... + c(m-1) (mod 2^61 - 1).
+# Основание выбирается случайно при запуске, чтобы коллизии нельзя было подобрать заранее.
+HASH_MOD = (1 << 61) - 1
+HASH_BASE = random.randrange(1 << 20, HASH_MOD - 1)
+_hash_powers: List[int] = [1]  # _hash_powers[m] = B^m, таблица растет по мере надобности.
+
+
+# Класс Node представляет узел splay-дерева, который хранит блок подряд идущих символов строки
+# (по умолчанию – один символ; в rope с блоками – до block_size символов).
 class Node:
-    __slots__ = ['ch', 'left', 'right', 'parent', 'size']
+    __slots__ = ['ch', 'left', 'right', 'parent', 'size', 'rev']
+    # У обычного узла хеша нет: поле hash есть только у HashedNode, а это значение читают update и push.
+    hash: Optional[Tuple[int, int]] = None
 
     def __init__(self, ch: str) -> None:
-        # Инициализация узла: сохраняем символ, ссылки на детей и родителя, а также размер поддерева.
-        self.ch: str = ch           # Символ, который хранится в узле.
+        # Инициализация узла: сохраняем блок, ссылки на детей и родителя, а также размер поддерева.
+        self.ch: str = ch           # Блок символов, который хранится в узле.
         self.left: Optional['Node'] = None   # Ссылка на левое поддерево.
         self.right: Optional['Node'] = None  # Ссылка на правое поддерево.
         self.parent: Optional['Node'] = None # Ссылка на родительский узел.
-        self.size: int = 1          # Размер поддерева (начально 1, так как узел сам по себе).
+        self.size: int = len(ch)    # Размер поддерева в символах (начально – длина собственного блока).
+        self.rev: bool = False      # Отложенный разворот: всё поддерево нужно развернуть.
+
+
+# Класс HashedNode – узел rope с хешами подстрок (subtree_hash, substring_hash, substrings_equal).
+# Такой rope строится явно: build_rope(s, new_node=HashedNode); обычные узлы не тратят память на хеш.
+class HashedNode(Node):
+    __slots__ = ['hash']
+
+    def __init__(self, ch: str) -> None:
+        super().__init__(ch)
+        # Хеши поддерева (прямой, обратный) без учета собственного rev; None – не посчитаны или устарели.
+        self.hash: Optional[Tuple[int, int]] = None
 
 
 # Функция update пересчитывает поле size для узла, суммируя размеры его поддеревьев.
 def update(node: Optional[Node]) -> None:
     if node is None:
         return
-    node.size = 1  # Начинаем с единицы для самого узла.
+    if node.hash is not None:
+        node.hash = None      # Поддерево изменилось – хеш пересчитается при следующем запросе.
+    node.size = len(node.ch)  # Начинаем с длины блока самого узла.
     if node.left:
         node.size += node.left.size  # Добавляем размер левого поддерева.
         node.left.parent = node      # Обновляем родительскую ссылку для левого ребенка.
@@ -28,6 +60,22 @@ def update(node: Optional[Node]) -> None:
         node.right.parent = node     # Обновляем родительскую ссылку для правого ребенка.
 
 
+# Функция push проталкивает отложенный разворот узла вниз: меняет местами детей, разворачивает блок узла
+# и передает флаг детям. Вызывается перед тем, как смотреть на детей или блок узла.
+def push(node: Node) -> None:
+    if node.rev:
+        node.left, node.right = node.right, node.left
+        if len(node.ch) > 1:
+            node.ch = node.ch[::-1]
+        if node.left:
+            node.left.rev = not node.left.rev
+        if node.right:
+            node.right.rev = not node.right.rev
+        if node.hash is not None:
+            node.hash = (node.hash[1], node.hash[0])  # Строка поддерева развернулась.
+        node.rev = False
+
+
 # Функция rotate выполняет поворот узла x относительно его родителя.
 def rotate(x: Node) -> None:
     p = x.parent         # Узнаем родителя узла x.
@@ -59,6 +107,8 @@ def rotate(x: Node) -> None:
 
 
 # Функция splay поднимает узел x до корня дерева.
+# Отложенные развороты на пути от корня до x уже протолкнуты: split и merge находят x спуском от корня,
+# вызывая push на каждом узле, поэтому повороты видят настоящий порядок.
 def splay(x: Node) -> Node:
     while x.parent:
         p = x.parent
@@ -74,16 +124,38 @@ def splay(x: Node) -> Node:
 
 
 # Функция merge объединяет два splay-дерева так, что все узлы из left идут до узлов из right.
-def merge(left: Optional[Node], right: Optional[Node]) -> Optional[Node]:
+# При block_size > 1 соседние на стыке блоки склеиваются, если вместе не длиннее block_size; освободившийся
+# узел передается в release_node (например, обратно в пул узлов), если она задана.
+def merge(left: Optional[Node], right: Optional[Node], block_size: int = 1,
+          release_node: Optional[Callable[[Node], None]] = None) -> Optional[Node]:
     if left is None:
         return right
     if right is None:
         return left
     cur = left
-    # Находим самый правый узел в левом дереве (последний символ).
+    push(cur)
+    # Находим самый правый узел в левом дереве (последний блок).
     while cur.right:
         cur = cur.right
+        push(cur)
     left = splay(cur)    # Поднимаем этот узел к корню.
+    if block_size > 1:
+        cur = right
+        push(cur)
+        # Находим самый левый узел в правом дереве (первый блок).
+        while cur.left:
+            cur = cur.left
+            push(cur)
+        right = splay(cur)
+        if len(left.ch) + len(right.ch) <= block_size:
+            left.ch += right.ch   # Склеиваем блоки на стыке, узел right больше не нужен.
+            glued, right = right, right.right
+            if release_node is not None:
+                release_node(glued)
+            if right is None:
+                update(left)
+                return left
+            right.parent = None
     left.right = right   # Присоединяем правое дерево как правое поддерево.
     right.parent = left  # Устанавливаем родительскую связь.
     update(left)         # Обновляем размер поддерева.
@@ -91,8 +163,10 @@ def merge(left: Optional[Node], right: Optional[Node]) -> Optional[Node]:
 
 
 # Функция split делит дерево на две части по индексу.
-# Левая часть содержит первые index элементов, правая – оставшиеся.
-def split(root: Optional[Node], index: int) -> Tuple[Optional[Node], Optional[Node]]:
+# Левая часть содержит первые index элементов, правая – оставшиеся. Если разрез проходит внутри блока,
+# узел для хвоста блока создает new_node (по умолчанию – конструктор того же вида, что и разрезаемый узел).
+def split(root: Optional[Node], index: int,
+          new_node: Optional[Callable[[str], Node]] = None) -> Tuple[Optional[Node], Optional[Node]]:
     if root is None:
         return None, None
     if index < 0 or index > root.size:
@@ -103,19 +177,28 @@ def split(root: Optional[Node], index: int) -> Tuple[Optional[Node], Optional[No
         return root, None
 
     cur = root
-    # Используем размер поддеревьев, чтобы спуститься к нужному узлу.
+    # Используем размер поддеревьев, чтобы спуститься к блоку, содержащему символ с номером index.
     while True:
+        push(cur)
         left_size = cur.left.size if cur.left else 0
         if index < left_size:
             cur = cur.left  # Ищем в левом поддереве.
-        elif index > left_size:
-            index -= left_size + 1  # Учитываем левое поддерево и текущий узел.
-            if cur.right is None:
-                break
+        elif index >= left_size + len(cur.ch):
+            index -= left_size + len(cur.ch)  # Учитываем левое поддерево и блок текущего узла.
             cur = cur.right  # Ищем в правом поддереве.
         else:
-            break  # Нашли узел, где количество узлов в левом поддереве равно index.
+            index -= left_size  # Смещение символа внутри блока.
+            break
     root = splay(cur)  # Поднимаем найденный узел к корню.
+    if index > 0:
+        # Разрез проходит внутри блока: хвост блока вместе с правым поддеревом уходит в правую часть.
+        tail = (new_node or root.__class__)(root.ch[index:])
+        root.ch = root.ch[:index]
+        tail.right = root.right
+        root.right = None
+        update(tail)
+        update(root)
+        return root, tail
     left = root.left   # Левая часть – все узлы, находящиеся слева от корня.
     if left:
         left.parent = None  # Отсоединяем левую часть от корня.
@@ -124,50 +207,126 @@ def split(root: Optional[Node], index: int) -> Tuple[Optional[Node], Optional[No
     return left, root
 
 
-# Функция build_rope строит сбалансированное splay-дерево (rope) из заданной строки.
-def build_rope(s: str) -> Optional[Node]:
-    def build(left: int, right: int) -> Optional[Node]:
-        if left > right:
-            return None  # Если диапазон пуст, возвращаем None.
-        mid = (left + right) // 2  # Находим средний индекс для балансировки.
-        node = Node(s[mid])        # Создаем узел для символа из середины.
-        node.left = build(left, mid - 1)   # Рекурсивно строим левое поддерево.
-        if node.left:
-            node.left.parent = node
-        node.right = build(mid + 1, right)  # Рекурсивно строим правое поддерево.
-        if node.right:
-            node.right.parent = node
-        update(node)  # Обновляем размер узла с учетом его поддеревьев.
-        return node
-    return build(0, len(s) - 1)
+# Функция build_rope строит сбалансированное splay-дерево (rope) из заданной строки за O(n) без рекурсии.
+# Узлы нумеруются с единицы в порядке символов; высота узла i равна числу нулевых младших битов i,
+# его левый ребенок – i - 2^(h-1), правый – i + 2^(h-1) (или ближайший существующий узел на пути
+# влево от него, если строка короче). Поддерево узла i покрывает отрезок [i - 2^h + 1, i + 2^h - 1],
+# поэтому размеры и ссылки на родителей выставляются сразу, без вызовов update. Глубина – O(log n).
+# При block_size > 1 строка режется на блоки по block_size символов, и узлы строятся по блокам.
+# new_node создает узел по блоку (по умолчанию – конструктор Node; RopeSession берет узлы из пула).
+def build_rope(s: Union[str, bytes, bytearray, memoryview], encoding: str = "utf-8",
+               block_size: int = 1, new_node: Callable[[str], Node] = Node) -> Optional[Node]:
+    if block_size < 1:
+        raise ValueError("block_size must be positive")
+    if not isinstance(s, str):
+        s = bytes(s).decode(encoding)  # Байтовый буфер (например, memoryview над mmap) декодируем в строку.
+    if not s:
+        return None  # Пустая строка – пустое дерево.
+    nodes: List[Node] = [Node("")]  # Фиктивный узел с индексом 0, чтобы нумерация шла с единицы.
+    if block_size == 1:
+        nodes.extend(map(new_node, s))
+    else:
+        nodes.extend(new_node(s[start:start + block_size]) for start in range(0, len(s), block_size))
+    n = len(nodes) - 1
+    shortage = block_size - len(nodes[n].ch)  # Насколько последний блок короче остальных.
+
+    for i in range(2, n + 1, 2):  # Нечётные номера – листья, их размер уже выставлен.
+        low = i & -i  # 2^h, где h – высота узла i.
+        node = nodes[i]
+        last = min(i + low - 1, n)  # Последний блок покрываемого отрезка, обрезанного по n.
+        node.size = (last - i + low) * block_size - (shortage if last == n else 0)
+        half = low >> 1
+        child = nodes[i - half]  # Левое поддерево всегда полное.
+        node.left = child
+        child.parent = node
+        j = i + half
+        while j > n and half > 1:
+            # Правого ребенка нет в строке: спускаемся к его левому ребенку.
+            half >>= 1
+            j -= half
+        if j <= n:
+            child = nodes[j]
+            node.right = child
+            child.parent = node
+    return nodes[1 << (n.bit_length() - 1)]  # Корень – наибольшая степень двойки, не превосходящая n.
+
+
+# Функция load_rope строит rope из файла (текстового или бинарного) либо из байтового буфера.
+# Файл читается блоками по chunk_size, поэтому подходит и для многомегабайтных документов.
+def load_rope(source: Union[IO, bytes, bytearray, memoryview], encoding: str = "utf-8",
+              chunk_size: int = 1 << 20, block_size: int = 1) -> Optional[Node]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return build_rope(source, encoding, block_size)
+    chunks = []
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    if chunks and not isinstance(chunks[0], str):
+        return build_rope(b"".join(chunks), encoding, block_size)  # Бинарный файл.
+    return build_rope("".join(chunks), block_size=block_size)
 
 
 # Функция rope_cut_and_paste реализует основную операцию: вырезание подстроки S[i...j] и вставка её
-# после k-го символа оставшейся строки.
-def rope_cut_and_paste(root: Optional[Node], i: int, j: int, k: int) -> Optional[Node]:
+# после k-го символа оставшейся строки. block_size передается в merge для склейки коротких блоков,
+# new_node – в split для хвостов разрезанных блоков, release_node – в merge для склеенных узлов. Все проверки выполняются до первого split, поэтому
+# при некорректном запросе дерево остается целым (его узлы можно вернуть в пул, см. RopeSession).
+def rope_cut_and_paste(root: Optional[Node], i: int, j: int, k: int, block_size: int = 1,
+                       new_node: Optional[Callable[[str], Node]] = None,
+                       release_node: Optional[Callable[[Node], None]] = None) -> Optional[Node]:
     # Проверяем, что индексы неотрицательны и что i не больше j.
     if i < 0 or j < 0 or k < 0:
         raise ValueError("Indices must be non-negative")
     if i > j:
         raise ValueError("Invalid query: i must be <= j")
-
-    # Разбиваем дерево на две части: A содержит символы [0, i-1], а B содержит символы [i, конец].
-    A, B = split(root, i)
-    if B is None or B.size < (j - i + 1):
+    size = root.size if root else 0
+    if j >= size:
         raise ValueError("Invalid query: j is out of range")
+    # Позиция вставки k не должна превышать длину строки без вырезанной подстроки.
+    if k > size - (j - i + 1):
+        raise ValueError("Invalid query: k is out of range")
 
+    # Разбиваем дерево на две части: A содержит символы [0, i-1], а B содержит символы [i, конец].
+    A, B = split(root, i, new_node)
     # Из дерева B вырезаем поддерево C (подстрока S[i...j]) и получаем D, которое содержит оставшиеся символы.
-    C, D = split(B, j - i + 1)
+    C, D = split(B, j - i + 1, new_node)
     # Объединяем A и D, чтобы получить дерево без вырезанной подстроки.
-    merged = merge(A, D)
-    # Проверяем, что позиция вставки k не превышает размер обновленного дерева.
-    rem_size = merged.size if merged else 0
-    if k < 0 or k > rem_size:
-        raise ValueError("Invalid query: k is out of range")
+    merged = merge(A, D, block_size, release_node)
     # Разбиваем дерево merged на L (первые k символов) и R (оставшиеся символы).
-    L, R = split(merged, k)
+    L, R = split(merged, k, new_node)
     # Вставляем вырезанную подстроку C между L и R и возвращаем итоговое дерево.
-    return merge(merge(L, C), R)
+    return merge(merge(L, C, block_size, release_node), R, block_size, release_node)
+
+
+# Функция rope_reverse разворачивает подстроку S[i...j] за O(log n) амортизированно: подстрока вырезается
+# двумя split, её корню выставляется отложенный разворот (push выполнит его при следующем спуске), и части
+# объединяются обратно. Как и в rope_cut_and_paste, запрос проверяется до первого split.
+def rope_reverse(root: Optional[Node], i: int, j: int, block_size: int = 1,
+                 new_node: Optional[Callable[[str], Node]] = None,
+                 release_node: Optional[Callable[[Node], None]] = None) -> Optional[Node]:
+    if i < 0 or j < 0:
+        raise ValueError("Indices must be non-negative")
+    if i > j:
+        raise ValueError("Invalid query: i must be <= j")
+    if j >= (root.size if root else 0):
+        raise ValueError("Invalid query: j is out of range")
+    A, B = split(root, i, new_node)
+    C, D = split(B, j - i + 1, new_node)
+    C.rev = not C.rev
+    return merge(merge(A, C, block_size, release_node), D, block_size, release_node)
+
+
+# Функция apply_query применяет к дереву один запрос любого типа (см. Query); new_node и release_node
+# передаются в split и merge (см. rope_cut_and_paste).
+def apply_query(root: Optional[Node], query: Query, block_size: int = 1,
+                new_node: Optional[Callable[[str], Node]] = None,
+                release_node: Optional[Callable[[Node], None]] = None) -> Optional[Node]:
+    if len(query) == 2:
+        return rope_reverse(root, query[0], query[1], block_size, new_node, release_node)
+    if len(query) == 3:
+        return rope_cut_and_paste(root, query[0], query[1], query[2], block_size, new_node, release_node)
+    raise ValueError("Query must contain 2 or 3 integers")
 
 
 # Функция traverse выполняет in-order обход дерева и собирает символы в итоговую строку.
@@ -178,49 +337,303 @@ def traverse(root: Optional[Node]) -> str:
     # Обход дерева с использованием стека: идем влево, затем обрабатываем узлы, потом идем вправо.
     while stack or cur:
         if cur:
+            push(cur)
             stack.append(cur)
             cur = cur.left  # Переход к левому поддереву.
         else:
             cur = stack.pop()
-            result.append(cur.ch)  # Добавляем символ текущего узла.
+            result.append(cur.ch)  # Добавляем блок текущего узла.
             cur = cur.right  # Переход к правому поддереву.
     return "".join(result)
 
 
-# Функция file_io осуществляет ввод исходных данных, выполнение операций над деревом и вывод результата в файл.
-@time_memory_decorator
-def file_io() -> None:
-    with open("txt/input.txt", "r") as f:
-        lines = f.read().splitlines()
-    s: str = lines[0].strip()  # Первая строка – исходная строка S.
-    n: int = int(lines[1].strip())  # Вторая строка – количество запросов.
-    queries: List[Tuple[int, int, int]] = [
-        tuple(map(int, line.split())) for line in lines[2:2 + n]
-    ]
+# Функция iter_chars лениво перечисляет символы строки в порядке in-order обхода, не собирая её целиком.
+def iter_chars(root: Optional[Node]) -> Iterator[str]:
+    stack: List[Node] = []
+    cur = root
+    while stack or cur:
+        if cur:
+            push(cur)
+            stack.append(cur)
+            cur = cur.left
+        else:
+            cur = stack.pop()
+            yield from cur.ch
+            cur = cur.right
+
+
+# Функция char_at возвращает символ с номером index спуском по размерам поддеревьев за O(глубины дерева),
+# не перестраивая дерево и не собирая строку.
+def char_at(root: Optional[Node], index: int) -> str:
+    if index < 0 or index >= (root.size if root else 0):
+        raise IndexError("Index out of range")
+    cur = root
+    while True:
+        push(cur)
+        left_size = cur.left.size if cur.left else 0
+        if index < left_size:
+            cur = cur.left
+        elif index >= left_size + len(cur.ch):
+            index -= left_size + len(cur.ch)
+            cur = cur.right
+        else:
+            return cur.ch[index - left_size]
 
-    result = apply_queries(s=s, queries=queries)
 
-    with open("txt/output.txt", "w") as f:
-        f.write(result)
+# Функция _iter_blocks перечисляет куски блоков, составляющие S[i...j]. Спуск к символу i запоминает узлы,
+# от которых ушли влево (они идут следующими в порядке обхода), затем обход продолжается до символа j.
+# Посещаются только O(глубины + число узлов отрезка) узлов.
+def _iter_blocks(root: Optional[Node], i: int, j: int) -> Iterator[str]:
+    if i < 0 or i > j or j >= (root.size if root else 0):
+        raise ValueError("Invalid substring bounds")
+    remaining = j - i + 1
+    stack: List[Node] = []
+    cur = root
+    offset = i  # Номер символа i внутри поддерева cur.
+    while True:
+        push(cur)
+        left_size = cur.left.size if cur.left else 0
+        if offset < left_size:
+            stack.append(cur)
+            cur = cur.left
+        elif offset >= left_size + len(cur.ch):
+            offset -= left_size + len(cur.ch)
+            cur = cur.right
+        else:
+            offset -= left_size  # Смещение символа i внутри блока cur.
+            break
+    while True:
+        piece = cur.ch[offset:offset + remaining]
+        yield piece
+        remaining -= len(piece)
+        if remaining == 0:
+            return
+        offset = 0
+        # Следующий узел в порядке обхода: самый левый в правом поддереве или ближайший сохраненный предок.
+        cur = cur.right
+        while cur:
+            push(cur)
+            stack.append(cur)
+            cur = cur.left
+        cur = stack.pop()
 
 
-def apply_queries(s: str, queries: List[Tuple[int, int, int]]) -> str:
+# Функция iter_range лениво перечисляет символы S[i...j], обходя только нужные узлы.
+def iter_range(root: Optional[Node], i: int, j: int) -> Iterator[str]:
+    for piece in _iter_blocks(root, i, j):
+        yield from piece
+
+
+# Функция substring возвращает подстроку S[i...j] за O(глубины + j - i) без обхода всего дерева.
+def substring(root: Optional[Node], i: int, j: int) -> str:
+    return "".join(_iter_blocks(root, i, j))
+
+
+# Функция _power возвращает B^m по модулю HASH_MOD, достраивая таблицу степеней.
+def _power(m: int) -> int:
+    while len(_hash_powers) <= m:
+        _hash_powers.append(_hash_powers[-1] * HASH_BASE % HASH_MOD)
+    return _hash_powers[m]
+
+
+# Функция _string_hash считает полиномиальный хеш обычной строки (блока узла или образца).
+def _string_hash(text: str) -> int:
+    value = 0
+    for c in text:
+        value = (value * HASH_BASE + ord(c)) % HASH_MOD
+    return value
+
+
+# Функция subtree_hash возвращает пару (прямой, обратный) хешей строки поддерева с учетом отложенного
+# разворота node (rope из HashedNode). Хеши хранятся в узлах, а update (в том числе при каждом повороте)
+# только сбрасывает их, поэтому пересчитываются лишь узлы, измененные с прошлого запроса. Сложность:
+# первый вызов на дереве – O(n); затем – O(числа узлов на путях splay, затронутых split/merge с прошлого
+# вызова), то есть O(log n) амортизированно на операцию. Пересчет идет без рекурсии, так как splay-дерево
+# может быть глубоким.
+def subtree_hash(node: Optional[Node]) -> Tuple[int, int]:
+    if node is None:
+        return 0, 0
+    if not isinstance(node, HashedNode):
+        raise TypeError("Hashing requires a rope built with new_node=HashedNode")
+    stack: List[Node] = [node]
+    while stack:
+        cur = stack[-1]
+        if cur.hash is not None:
+            stack.pop()
+            continue
+        dirty = [child for child in (cur.left, cur.right) if child and child.hash is None]
+        if dirty:
+            stack.extend(dirty)  # Сначала дети.
+            continue
+        stack.pop()
+        left_forward, left_backward = _effective_hash(cur.left)
+        right_forward, right_backward = _effective_hash(cur.right)
+        left_size = cur.left.size if cur.left else 0
+        right_size = cur.right.size if cur.right else 0
+        block = len(cur.ch)
+        # Прямой хеш: левое поддерево, блок, правое; обратный – их развороты в обратном порядке.
+        forward = (left_forward * _power(block + right_size) + _string_hash(cur.ch) * _power(right_size)
+                   + right_forward) % HASH_MOD
+        backward = (right_backward * _power(block + left_size) + _string_hash(cur.ch[::-1]) * _power(left_size)
+                    + left_backward) % HASH_MOD
+        cur.hash = (forward, backward)
+    return _effective_hash(node)
+
+
+# Функция _effective_hash возвращает посчитанную пару хешей узла с учетом его флага rev.
+def _effective_hash(node: Optional[Node]) -> Tuple[int, int]:
+    if node is None:
+        return 0, 0
+    forward, backward = node.hash
+    return (backward, forward) if node.rev else (forward, backward)
+
+
+# Функция substring_hash возвращает новый корень и хеш подстроки S[i...j] (rope из HashedNode): подстрока
+# вырезается двумя split, хеш берется из ее корня, и части объединяются обратно.
+def substring_hash(root: Optional[Node], i: int, j: int, block_size: int = 1) -> Tuple[Optional[Node], int]:
+    if i < 0 or i > j or j >= (root.size if root else 0):
+        raise ValueError("Invalid substring bounds")
+    if not isinstance(root, HashedNode):
+        raise TypeError("Hashing requires a rope built with new_node=HashedNode")  # До split: дерево не меняется.
+    A, B = split(root, i)
+    C, D = split(B, j - i + 1)
+    value = subtree_hash(C)[0]
+    return merge(merge(A, C, block_size), D, block_size), value
+
+
+# Функция substrings_equal сравнивает S[a...b] и S[c...d] по хешам за O(log n) амортизированно (с вероятностью
+# ошибки порядка n / 2^61) и возвращает новый корень и результат сравнения.
+def substrings_equal(root: Optional[Node], a: int, b: int, c: int, d: int,
+                     block_size: int = 1) -> Tuple[Optional[Node], bool]:
+    root, first = substring_hash(root, a, b, block_size)
+    root, second = substring_hash(root, c, d, block_size)
+    return root, b - a == d - c and first == second
+
+
+# Функция find ищет первое вхождение pattern алгоритмом Рабина–Карпа по лениво перечисляемым символам
+# (iter_chars): окно длины |pattern| сдвигается с пересчетом хеша за O(1), совпадение хешей проверяется
+# посимвольно. Возвращает индекс вхождения или -1. Хеши узлов не используются (подходит любой rope), поэтому
+# каждый вызов просматривает строку заново: время O(n + |pattern|), дополнительная память O(|pattern|).
+def find(root: Optional[Node], pattern: str) -> int:
+    m = len(pattern)
+    if m == 0:
+        return 0
+    target = _string_hash(pattern)
+    top = _power(m - 1)  # Вес символа, выходящего из окна.
+    window: deque = deque()
+    value = 0
+    for index, c in enumerate(iter_chars(root)):
+        if len(window) == m:
+            value = (value - ord(window.popleft()) * top) % HASH_MOD
+        window.append(c)
+        value = (value * HASH_BASE + ord(c)) % HASH_MOD
+        if len(window) == m and value == target and "".join(window) == pattern:
+            return index - m + 1
+    return -1
+
+
+# Функция read_queries лениво читает count запросов из открытого файла, по одной строке: "i j k" – вырезание
+# и вставка, "i j" – разворот. Запросы не собираются в список и передаются в rope по мере чтения.
+def read_queries(f: IO[str], count: int) -> Iterator[Query]:
+    for _ in range(count):
+        line = f.readline()
+        if not line:
+            raise ValueError("Input ended before all queries were read")
+        query = tuple(map(int, line.split()))
+        if len(query) not in (2, 3):
+            raise ValueError("Query must contain 2 or 3 integers")
+        yield query
+
+
+# Функция write_output атомарно записывает строку в файл: сначала во временный файл, затем переименование,
+# поэтому файл результата никогда не бывает записан наполовину. При ошибке временный файл удаляется.
+def write_output(path: str, text: str) -> None:
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Функция process_file выполняет одно задание: читает S и запросы из input_path (потоково, через read_queries),
+# применяет их к дереву и записывает результат в output_path. Если checkpoint_every > 0, то после каждых
+# checkpoint_every запросов текущая строка записывается в файл результата (промежуточный результат долгих
+# запусков), а в конце он заменяется итоговым. Ничего не печатает – используется и в пакетном режиме (batch.py).
+def process_file(input_path: str, output_path: str, checkpoint_every: int = 0) -> None:
+    with open(input_path, "r") as f:
+        s: str = f.readline().strip()  # Первая строка – исходная строка S.
+        n: int = int(f.readline().strip())  # Вторая строка – количество запросов.
+        root = build_rope(s)
+        for done, query in enumerate(read_queries(f, n), 1):
+            root = apply_query(root, query)
+            if checkpoint_every > 0 and done % checkpoint_every == 0:
+                write_output(output_path, traverse(root))
+
+    write_output(output_path, traverse(root))
+
+
+# Функция file_io осуществляет ввод исходных данных, выполнение операций над деревом и вывод результата в файл
+# (см. process_file), печатая время работы и пиковую память.
+@time_memory_decorator
+def file_io(input_path: str = "txt/input.txt", output_path: str = "txt/output.txt",
+            checkpoint_every: int = 0) -> None:
+    process_file(input_path, output_path, checkpoint_every)
+
+
+def apply_queries(s: str, queries: Iterable[Query], block_size: int = 1,
+                  engine: str = "nodes") -> str:
     """
     Применяет последовательность запросов к строке, используя структуру Rope.
 
     Параметры:
       s (str): Исходная строка.
-      queries (List[Tuple[int, int, int]]): Список запросов, где каждый запрос задаётся тройкой (i, j, k):
+      queries (Iterable[Query]): Запросы (список или генератор, например read_queries),
+            где каждый запрос задаётся тройкой (i, j, k) или парой (i, j):
             - i (int): Начальный индекс подстроки (включительно).
             - j (int): Конечный индекс подстроки (включительно).
-            - k (int): Позиция вставки (при k = 0 вставка в начало).
+            - k (int): Позиция вставки (при k = 0 вставка в начало); если k нет,
+              подстрока S[i...j] разворачивается.
+      block_size (int): Размер блока в листьях rope (1 – узел на символ). Большие блоки
+            уменьшают число узлов и поворотов примерно в block_size раз.
+      engine (str): "nodes" – дерево из объектов Node, "array" – дерево в параллельных
+            массивах (ArrayRope), "persistent" – персистентное дерево (VersionedRope,
+            каждый запрос создаёт новую версию). Два последних – только block_size = 1
+            и без разворотов.
 
     Возвращает:
       str: Итоговая строка после применения всех запросов.
+
+    Генерирует:
+      ValueError: Если engine неизвестен или запрос некорректен.
     """
-    root = build_rope(s)
-    for i, j, k in queries:
-        root = rope_cut_and_paste(root, i, j, k)
+    if engine == "array":
+        if block_size != 1:
+            raise ValueError("Array engine supports only block_size = 1")
+        rope = ArrayRope(s)
+        for query in queries:
+            if len(query) != 3:
+                raise ValueError("Array engine supports only cut-and-paste queries")
+            rope.cut_and_paste(*query)
+        return rope.traverse()
+    if engine == "persistent":
+        if block_size != 1:
+            raise ValueError("Persistent engine supports only block_size = 1")
+        root = persistent.build_persistent(s)
+        for query in queries:
+            if len(query) != 3:
+                raise ValueError("Persistent engine supports only cut-and-paste queries")
+            root = persistent.cut_and_paste(root, *query)
+        return persistent.traverse(root)
+    if engine != "nodes":
+        raise ValueError(f"Unknown engine: {engine!r}")
+
+    root = build_rope(s, block_size=block_size)
+    for query in queries:
+        root = apply_query(root, query, block_size)
     return traverse(root)
 
 
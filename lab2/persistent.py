@@ -0,0 +1,162 @@
+import random
+from typing import Iterable, List, Optional, Tuple
+
+
+# Класс PersistentNode – неизменяемый после построения узел персистентного rope (декартово дерево по
+# неявному ключу). Операции не меняют существующие узлы, а копируют узлы на пути от корня, поэтому
+# каждая версия строки – это свой корень, а нетронутые поддеревья общие для всех версий.
+class PersistentNode:
+    __slots__ = ['ch', 'left', 'right', 'size']
+
+    def __init__(self, ch: str, left: Optional['PersistentNode'] = None,
+                 right: Optional['PersistentNode'] = None) -> None:
+        self.ch: str = ch                              # Символ узла.
+        self.left: Optional['PersistentNode'] = left   # Левое поддерево.
+        self.right: Optional['PersistentNode'] = right # Правое поддерево.
+        # Размер поддерева считается один раз: узел больше не меняется.
+        self.size: int = 1 + (left.size if left else 0) + (right.size if right else 0)
+
+
+# Генератор случайных чисел для merge; можно пересоздать с seed для воспроизводимости.
+_rng = random.Random()
+
+
+# Функция _size возвращает размер поддерева (0 для пустого).
+def _size(node: Optional[PersistentNode]) -> int:
+    return node.size if node else 0
+
+
+# Функция build_persistent строит сбалансированное дерево из строки без рекурсии, по той же схеме, что
+# build_rope в main.py: узел i (с единицы) имеет высоту, равную числу нулевых младших битов i. Узлы создаются
+# по возрастанию высоты, так что дети каждого узла к моменту его создания уже готовы.
+def build_persistent(s: str) -> Optional[PersistentNode]:
+    n = len(s)
+    if n == 0:
+        return None
+    nodes: List[Optional[PersistentNode]] = [None] * (n + 1)
+    for i in range(1, n + 1, 2):
+        nodes[i] = PersistentNode(s[i - 1])  # Нечётные номера – листья.
+    low = 2
+    while low <= n:
+        half = low >> 1
+        for i in range(low, n + 1, 2 * low):  # Все узлы высоты log2(low).
+            j = i + half
+            step = half
+            while j > n and step > 1:
+                # Правого ребенка нет в строке: спускаемся к его левому ребенку.
+                step >>= 1
+                j -= step
+            nodes[i] = PersistentNode(s[i - 1], nodes[i - half], nodes[j] if j <= n else None)
+        low <<= 1
+    return nodes[1 << (n.bit_length() - 1)]
+
+
+# Функция split делит дерево на первые index символов и остальные. Копируются только узлы на пути
+# разреза (O(log n) в среднем), исходное дерево не меняется.
+def split(root: Optional[PersistentNode], index: int) -> Tuple[Optional[PersistentNode], Optional[PersistentNode]]:
+    if root is None:
+        return None, None
+    if index < 0 or index > root.size:
+        raise ValueError("Invalid split index")
+    if index == 0:
+        return None, root
+    if index == root.size:
+        return root, None
+    left_size = _size(root.left)
+    if index <= left_size:
+        a, b = split(root.left, index)
+        return a, PersistentNode(root.ch, b, root.right)
+    a, b = split(root.right, index - left_size - 1)
+    return PersistentNode(root.ch, root.left, a), b
+
+
+# Функция merge объединяет два дерева (все символы a идут до символов b), копируя узлы на пути слияния.
+# Корнем становится корень a с вероятностью |a| / (|a| + |b|): такое слияние по размерам сохраняет
+# ожидаемую глубину O(log n) и не требует хранить приоритеты в узлах.
+def merge(a: Optional[PersistentNode], b: Optional[PersistentNode]) -> Optional[PersistentNode]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if _rng.random() * (a.size + b.size) < a.size:
+        return PersistentNode(a.ch, a.left, merge(a.right, b))
+    return PersistentNode(b.ch, merge(a, b.left), b.right)
+
+
+# Функция cut_and_paste возвращает корень новой версии: S[i...j] вырезана и вставлена после k-го символа
+# оставшейся строки. Проверки и ошибки те же, что у rope_cut_and_paste; старая версия остаётся доступной.
+def cut_and_paste(root: Optional[PersistentNode], i: int, j: int, k: int) -> Optional[PersistentNode]:
+    if i < 0 or j < 0 or k < 0:
+        raise ValueError("Indices must be non-negative")
+    if i > j:
+        raise ValueError("Invalid query: i must be <= j")
+    A, B = split(root, i)
+    if _size(B) < j - i + 1:
+        raise ValueError("Invalid query: j is out of range")
+    C, D = split(B, j - i + 1)
+    rest = merge(A, D)
+    if k > _size(rest):
+        raise ValueError("Invalid query: k is out of range")
+    L, R = split(rest, k)
+    return merge(merge(L, C), R)
+
+
+# Функция char_at возвращает символ с номером index за O(глубины) = O(log n) в среднем.
+def char_at(root: Optional[PersistentNode], index: int) -> str:
+    if index < 0 or index >= _size(root):
+        raise IndexError("Index out of range")
+    cur = root
+    while True:
+        left_size = _size(cur.left)
+        if index < left_size:
+            cur = cur.left
+        elif index > left_size:
+            index -= left_size + 1
+            cur = cur.right
+        else:
+            return cur.ch
+
+
+# Функция traverse собирает строку версии in-order обходом за O(n).
+def traverse(root: Optional[PersistentNode]) -> str:
+    result: List[str] = []
+    stack: List[PersistentNode] = []
+    cur = root
+    while stack or cur:
+        if cur:
+            stack.append(cur)
+            cur = cur.left
+        else:
+            cur = stack.pop()
+            result.append(cur.ch)
+            cur = cur.right
+    return "".join(result)
+
+
+# Класс VersionedRope хранит все версии документа: версия 0 – исходная строка, версия v – результат
+# первых v запросов. Каждая версия – корень персистентного дерева, так что память растет на O(log n)
+# узлов за запрос, а не на длину строки.
+class VersionedRope:
+    def __init__(self, s: str = "") -> None:
+        self.versions: List[Optional[PersistentNode]] = [build_persistent(s)]
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    # Метод apply применяет запрос (i, j, k) к последней версии и возвращает номер новой версии.
+    def apply(self, i: int, j: int, k: int) -> int:
+        self.versions.append(cut_and_paste(self.versions[-1], i, j, k))
+        return len(self.versions) - 1
+
+    # Метод apply_all применяет запросы по очереди, создавая по версии на запрос.
+    def apply_all(self, queries: Iterable[Tuple[int, int, int]]) -> None:
+        for i, j, k in queries:
+            self.apply(i, j, k)
+
+    # Метод text возвращает строку версии version (по умолчанию – последней) за O(n).
+    def text(self, version: int = -1) -> str:
+        return traverse(self.versions[version])
+
+    # Метод char_at возвращает символ index версии version за O(log n).
+    def char_at(self, index: int, version: int = -1) -> str:
+        return char_at(self.versions[version], index)
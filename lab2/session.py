@@ -0,0 +1,104 @@
+import gc
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from lab2.main import Node, Query, apply_query, build_rope, traverse
+
+# Задание для RopeSession: исходная строка и её запросы.
+Job = Tuple[str, Iterable[Query]]
+
+
+# Класс NodePool – пул узлов Node со списком свободных узлов. Узлы деревьев, которые больше не нужны,
+# возвращаются в пул (release_tree) и переиспользуются при построении следующих деревьев (acquire),
+# поэтому при обработке множества документов объекты почти не создаются и не удаляются.
+class NodePool:
+    def __init__(self, max_free: int = 1 << 20) -> None:
+        if max_free < 0:
+            raise ValueError("max_free must be non-negative")
+        self.max_free: int = max_free  # Сколько свободных узлов держать, остальные отдаются сборщику.
+        self.free: List[Node] = []     # Список свободных узлов.
+        self.created: int = 0          # Сколько узлов создано пулом за всё время.
+
+    # Метод acquire возвращает узел с блоком ch: свободный из пула (заново инициализированный) или новый.
+    def acquire(self, ch: str) -> Node:
+        if self.free:
+            # release_tree уже обнулил ссылки; остается выставить блок, размер и флаг разворота.
+            node = self.free.pop()
+            node.ch = ch
+            node.size = len(ch)
+            node.rev = False
+            return node
+        self.created += 1
+        return Node(ch)
+
+    # Метод release возвращает в пул один узел (например, узел, блок которого merge приклеил к соседнему).
+    # Ссылки узла обнуляются, поэтому циклы "родитель – ребенок" разрываются и лишние узлы освобождаются
+    # без сборщика мусора.
+    def release(self, node: Node) -> None:
+        node.left = node.right = node.parent = None
+        if len(self.free) < self.max_free:
+            self.free.append(node)
+
+    # Метод release_tree возвращает в пул все узлы дерева (обход без рекурсии).
+    def release_tree(self, root: Optional[Node]) -> None:
+        stack: List[Node] = [root] if root else []
+        release = self.release
+        while stack:
+            node = stack.pop()
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+            release(node)
+
+
+# Класс RopeSession обрабатывает много документов (строка и запросы к ней) подряд, переиспользуя узлы
+# из общего NodePool. На время сессии (with RopeSession(...) as session) сборщик мусора можно отключить
+# (gc_mode="disable") или задать ему пороги (gc_mode="tune", gc_threshold); при выходе прежние настройки
+# восстанавливаются. Узлы между документами не накапливаются, так что память ограничена размером
+# самого большого документа и max_free.
+class RopeSession:
+    GC_MODES = ("keep", "disable", "tune")
+
+    def __init__(self, block_size: int = 1, max_free: int = 1 << 20, gc_mode: str = "disable",
+                 gc_threshold: Sequence[int] = (100000, 50, 50)) -> None:
+        if gc_mode not in self.GC_MODES:
+            raise ValueError(f"Unknown gc_mode: {gc_mode!r}")
+        self.block_size: int = block_size
+        self.pool: NodePool = NodePool(max_free)
+        self.gc_mode: str = gc_mode
+        self.gc_threshold: Tuple[int, ...] = tuple(gc_threshold)
+        self._saved_gc: Optional[Tuple[bool, Tuple[int, ...]]] = None
+
+    def __enter__(self) -> 'RopeSession':
+        self._saved_gc = (gc.isenabled(), gc.get_threshold())
+        if self.gc_mode == "disable":
+            gc.disable()
+        elif self.gc_mode == "tune":
+            gc.set_threshold(*self.gc_threshold)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        enabled, threshold = self._saved_gc
+        gc.set_threshold(*threshold)
+        if enabled:
+            gc.enable()
+        self._saved_gc = None
+
+    # Метод run применяет запросы к строке s на дереве из узлов пула и возвращает итоговую строку.
+    # Хвосты разрезанных блоков тоже берутся из пула, а склеенные блоки возвращаются в него. Некорректный запрос отклоняется до изменения дерева,
+    # поэтому и при ошибке все узлы документа возвращаются в пул: при отключенном сборщике мусора
+    # отрезанные части иначе так и остались бы в памяти.
+    def run(self, s: str, queries: Iterable[Query]) -> str:
+        acquire = self.pool.acquire
+        root = build_rope(s, block_size=self.block_size, new_node=acquire)
+        try:
+            for query in queries:
+                root = apply_query(root, query, self.block_size, acquire, self.pool.release)
+            return traverse(root)
+        finally:
+            self.pool.release_tree(root)
+
+    # Метод run_many лениво обрабатывает задания по очереди и выдает результаты в том же порядке.
+    def run_many(self, jobs: Iterable[Job]) -> Iterator[str]:
+        for s, queries in jobs:
+            yield self.run(s, queries)
@@ -1,6 +1,37 @@
+import gc
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
 import unittest
-from typing import List, Tuple
-from lab2.main import apply_queries
+from unittest import mock
+from typing import List, Optional, Tuple
+from lab2.array_rope import ArrayRope
+from lab2.batch import run_batch
+from lab2.persistent import VersionedRope, build_persistent
+from lab2.session import NodePool, RopeSession
+from utils import measure
+from lab2.main import (HashedNode, Node, apply_query, apply_queries, build_rope, char_at, file_io, find, iter_chars,
+                       iter_range, load_rope, read_queries, rope_cut_and_paste, rope_reverse,
+                       substring, substring_hash, substrings_equal, traverse, write_output)
+
+
+def check_tree(root: Optional[Node]) -> int:
+    """Проверяет размеры поддеревьев и ссылки на родителей без рекурсии; возвращает глубину дерева."""
+    depth = 0
+    stack = [(root, 1)] if root else []
+    while stack:
+        node, level = stack.pop()
+        depth = max(depth, level)
+        expected = len(node.ch) + (node.left.size if node.left else 0) + (node.right.size if node.right else 0)
+        assert node.size == expected, "size mismatch"
+        for child in (node.left, node.right):
+            if child:
+                assert child.parent is node, "parent mismatch"
+                stack.append((child, level + 1))
+    return depth
 
 
 class TestRopeOperations(unittest.TestCase):
@@ -100,5 +131,504 @@ class TestRopeOperations(unittest.TestCase):
             apply_queries(s, queries)
 
 
+def naive_apply(s: str, queries: List[Tuple[int, ...]]) -> str:
+    """Эталонная реализация запросов на обычных строках (пара (i, j) – разворот)."""
+    for query in queries:
+        if len(query) == 2:
+            i, j = query
+            s = s[:i] + s[i:j + 1][::-1] + s[j + 1:]
+            continue
+        i, j, k = query
+        cut = s[i:j + 1]
+        rest = s[:i] + s[j + 1:]
+        s = rest[:k] + cut + rest[k:]
+    return s
+
+
+def random_queries(n: int, count: int, rng: random.Random, reversals: float = 0.0) -> List[Tuple[int, ...]]:
+    """Случайные корректные запросы для строки длины n; доля разворотов – reversals."""
+    queries: List[Tuple[int, ...]] = []
+    for _ in range(count):
+        i = rng.randrange(n)
+        j = rng.randrange(i, n)
+        if rng.random() < reversals:
+            queries.append((i, j))
+        else:
+            queries.append((i, j, rng.randrange(n - (j - i + 1) + 1)))
+    return queries
+
+
+class TestBuildRope(unittest.TestCase):
+    def test_build_balanced(self) -> None:
+        """
+        Обычный случай.
+        Дерево строится без рекурсии, сохраняет порядок символов, размеры и ссылки на родителей,
+        а его глубина логарифмическая.
+        """
+        for n in list(range(0, 70)) + [1023, 1024, 1025]:
+            s = "".join(chr(ord("a") + i % 26) for i in range(n))
+            root = build_rope(s)
+            self.assertEqual(traverse(root), s)
+            self.assertLessEqual(check_tree(root), max(1, n.bit_length()))
+            if root:
+                self.assertIsNone(root.parent)
+
+    def test_load_rope(self) -> None:
+        """
+        Обычный случай.
+        Загрузка из текстового и бинарного файла (блоками) и из memoryview.
+        """
+        self.assertEqual(traverse(load_rope(io.StringIO("hello world"), chunk_size=3)), "hello world")
+        self.assertEqual(traverse(load_rope(io.BytesIO("привет".encode()), chunk_size=3)), "привет")
+        self.assertEqual(traverse(load_rope(memoryview(b"rope"))), "rope")
+        self.assertIsNone(load_rope(io.StringIO("")))
+
+
+class TestChunkedRope(unittest.TestCase):
+    def test_random_against_naive(self) -> None:
+        """
+        Обычный случай.
+        Rope с блоками разного размера даёт тот же результат, что и операции над строками,
+        а разрезы внутри блоков и склейки на стыках сохраняют корректные размеры.
+        """
+        rng = random.Random(7)
+        for _ in range(100):
+            n = rng.randrange(1, 50)
+            s = "".join(rng.choice("abcdef") for _ in range(n))
+            queries = random_queries(n, rng.randrange(20), rng)
+            expected = naive_apply(s, queries)
+            for block_size in (1, 2, 3, 8, 64):
+                self.assertEqual(apply_queries(s, queries, block_size), expected)
+                root = build_rope(s, block_size=block_size)
+                for i, j, k in queries:
+                    root = rope_cut_and_paste(root, i, j, k, block_size)
+                    check_tree(root)
+
+    def test_fewer_nodes(self) -> None:
+        """
+        Обычный случай.
+        Число узлов сокращается в block_size раз.
+        """
+        root = build_rope("x" * 1000, block_size=100)
+        self.assertEqual(root.size, 1000)
+        self.assertEqual(check_tree(root), 4)  # 10 блоков – дерево глубины 4.
+        with self.assertRaises(ValueError):
+            build_rope("abc", block_size=0)
+
+
+class TestArrayRope(unittest.TestCase):
+    def test_random_against_naive(self) -> None:
+        """
+        Обычный случай.
+        Дерево в параллельных массивах даёт тот же результат, что и операции над строками,
+        и после каждого запроса сохраняет корректные размеры и ссылки на родителей.
+        """
+        rng = random.Random(13)
+        for _ in range(100):
+            n = rng.randrange(1, 50)
+            s = "".join(rng.choice("abcdef") for _ in range(n))
+            queries = random_queries(n, rng.randrange(20), rng)
+            self.assertEqual(apply_queries(s, queries, engine="array"), naive_apply(s, queries))
+            rope = ArrayRope(s)
+            for i, j, k in queries:
+                rope.cut_and_paste(i, j, k)
+                for x in range(1, n + 1):
+                    self.assertEqual(rope.size[x], rope.size[rope.left[x]] + rope.size[rope.right[x]] + 1)
+                    for child in (rope.left[x], rope.right[x]):
+                        if child:
+                            self.assertEqual(rope.parent[child], x)
+
+    def test_snapshot_and_errors(self) -> None:
+        """
+        Граничный случай.
+        Снимок не меняется при последующих запросах; некорректные запросы и engine отклоняются.
+        """
+        rope = ArrayRope("abcdef")
+        snapshot = rope.snapshot()
+        rope.cut_and_paste(0, 1, 4)
+        self.assertEqual(rope.traverse(), "cdefab")
+        self.assertEqual(snapshot.traverse(), "abcdef")
+        self.assertEqual(ArrayRope("").traverse(), "")
+        with self.assertRaises(ValueError):
+            rope.cut_and_paste(2, 1, 0)
+        with self.assertRaises(ValueError):
+            rope.cut_and_paste(0, 1, 5)
+        with self.assertRaises(ValueError):
+            apply_queries("abc", [], engine="pointers")
+
+
+class TestStreamingIO(unittest.TestCase):
+    def test_read_queries_lazily(self) -> None:
+        """
+        Обычный случай.
+        Запросы читаются по одному и только по мере надобности; обрыв входа – ошибка.
+        """
+        f = io.StringIO("1 2 0\n0 0 3\nлишняя строка\n")
+        queries = read_queries(f, 2)
+        self.assertEqual(next(queries), (1, 2, 0))
+        self.assertEqual(f.readline(), "0 0 3\n")  # Вторая строка ещё не прочитана.
+        with self.assertRaises(ValueError):
+            list(read_queries(io.StringIO("1 2 0\n"), 2))
+
+    def test_file_io_checkpoints(self) -> None:
+        """
+        Обычный случай.
+        file_io пишет промежуточные результаты каждые checkpoint_every запросов и итоговый в конце.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "input.txt")
+            output_path = os.path.join(tmp, "output.txt")
+            with open(input_path, "w") as f:
+                f.write("hlelowrold\n5\n1 1 2\n0 0 0\n6 6 7\n0 0 0\n0 2 5\n")
+            with mock.patch("lab2.main.write_output", wraps=write_output) as write:
+                file_io.__wrapped__(input_path, output_path, checkpoint_every=2)
+            with open(output_path) as f:
+                self.assertEqual(f.read(), "loworhelld")
+            # Два промежуточных результата (после 2 и 4 запросов) и итоговый.
+            self.assertEqual([call.args[1] for call in write.call_args_list],
+                             ["hellowrold", "helloworld", "loworhelld"])
+            self.assertEqual(sorted(os.listdir(tmp)), ["input.txt", "output.txt"])
+
+    def test_write_output_failure(self) -> None:
+        """
+        Граничный случай.
+        Ошибка при замене файла не портит прежний результат и не оставляет временный файл.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, "output.txt")
+            write_output(output_path, "old")
+            with mock.patch("lab2.main.os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    write_output(output_path, "new")
+            with open(output_path) as f:
+                self.assertEqual(f.read(), "old")
+            self.assertEqual(os.listdir(tmp), ["output.txt"])
+
+
+class TestReverse(unittest.TestCase):
+    def test_random_against_naive(self) -> None:
+        """
+        Обычный случай.
+        Смесь разворотов и вырезаний с любым размером блока даёт тот же
+        результат, что и операции над строками; размеры и ссылки на родителей остаются верными.
+        """
+        rng = random.Random(16)
+        for _ in range(100):
+            n = rng.randrange(1, 40)
+            s = "".join(rng.choice("abcdef") for _ in range(n))
+            queries = random_queries(n, rng.randrange(30), rng, reversals=0.5)
+            expected = naive_apply(s, queries)
+            for block_size in (1, 3, 8):
+                self.assertEqual(apply_queries(s, queries, block_size), expected)
+            root = build_rope(s, block_size=3)
+            for query in queries:
+                root = (rope_reverse(root, *query, block_size=3) if len(query) == 2
+                        else rope_cut_and_paste(root, *query, block_size=3))
+                check_tree(root)
+
+    def test_reverse_queries(self) -> None:
+        """
+        Граничный случай.
+        Разворот всей строки, одного символа, двойной разворот; разворот во входном формате;
+        некорректные запросы отклоняются.
+        """
+        self.assertEqual(apply_queries("abcdef", [(0, 5)]), "fedcba")
+        self.assertEqual(apply_queries("abcdef", [(2, 2)]), "abcdef")
+        self.assertEqual(apply_queries("abcdef", [(1, 4), (1, 4)]), "abcdef")
+        self.assertEqual(list(read_queries(io.StringIO("0 3\n1 1 2\n"), 2)), [(0, 3), (1, 1, 2)])
+        with self.assertRaises(ValueError):
+            apply_queries("abc", [(1, 3)])
+        with self.assertRaises(ValueError):
+            apply_queries("abc", [(2, 1)])
+        with self.assertRaises(ValueError):
+            apply_queries("abc", [(0, 1)], engine="array")
+        with self.assertRaises(ValueError):
+            list(read_queries(io.StringIO("1\n"), 1))
+
+
+class TestPersistentRope(unittest.TestCase):
+    def test_versions_against_naive(self) -> None:
+        """
+        Обычный случай.
+        Каждая версия совпадает с результатом соответствующего префикса запросов – и при обходе,
+        и при чтении по индексу; старые версии не меняются от новых запросов.
+        """
+        rng = random.Random(17)
+        for _ in range(50):
+            n = rng.randrange(1, 40)
+            s = "".join(rng.choice("abcdef") for _ in range(n))
+            queries = random_queries(n, rng.randrange(15), rng)
+            rope = VersionedRope(s)
+            rope.apply_all(queries)
+            self.assertEqual(len(rope), len(queries) + 1)
+            for version in range(len(rope)):
+                expected = naive_apply(s, queries[:version])
+                self.assertEqual(rope.text(version), expected)
+                self.assertEqual([rope.char_at(x, version) for x in range(n)], list(expected))
+            self.assertEqual(apply_queries(s, queries, engine="persistent"), naive_apply(s, queries))
+
+    def test_structural_sharing(self) -> None:
+        """
+        Граничный случай.
+        Запрос копирует лишь O(log n) узлов; некорректные запросы и индексы отклоняются.
+        """
+        rope = VersionedRope("x" * 1024)
+        rope.apply(100, 199, 500)
+        old, new = rope.versions
+        seen = set()
+        stack = [old]
+        while stack:
+            node = stack.pop()
+            seen.add(id(node))
+            stack.extend(child for child in (node.left, node.right) if child)
+        copied = 0
+        stack = [new]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue  # Поддерево общее со старой версией.
+            copied += 1
+            stack.extend(child for child in (node.left, node.right) if child)
+        self.assertLess(copied, 200)
+        self.assertIsNone(build_persistent(""))
+        with self.assertRaises(ValueError):
+            rope.apply(0, 1024, 0)
+        with self.assertRaises(IndexError):
+            rope.char_at(1024)
+
+
+class TestRopeHashing(unittest.TestCase):
+    def test_random_against_naive(self) -> None:
+        """
+        Обычный случай.
+        После вырезаний и разворотов сравнение подстрок по хешам и поиск образца совпадают
+        с операциями над обычной строкой при любом размере блока.
+        """
+        rng = random.Random(18)
+        for _ in range(60):
+            n = rng.randrange(1, 40)
+            s = "".join(rng.choice("ab") for _ in range(n))
+            block_size = rng.choice((1, 3, 8))
+            root = build_rope(s, block_size=block_size, new_node=HashedNode)
+            for query in random_queries(n, 10, rng, reversals=0.5):
+                root = apply_query(root, query, block_size)
+                s = naive_apply(s, [query])
+                a, c = rng.randrange(n), rng.randrange(n)
+                b, d = rng.randrange(a, n), rng.randrange(c, n)
+                root, equal = substrings_equal(root, a, b, c, d, block_size)
+                self.assertEqual(equal, s[a:b + 1] == s[c:d + 1])
+                pattern = s[a:b + 1] if rng.random() < 0.5 else "".join(rng.choice("ab") for _ in range(3))
+                self.assertEqual(find(root, pattern), s.find(pattern))
+            check_tree(root)
+            self.assertEqual("".join(iter_chars(root)), s)
+
+    def test_hash_edge_cases(self) -> None:
+        """
+        Граничный случай.
+        Хеш подстроки не зависит от её положения и от разворотов; пустой образец и
+        некорректные границы.
+        """
+        root = build_rope("abcabc", new_node=HashedNode)
+        root, first = substring_hash(root, 0, 2)
+        root = rope_reverse(rope_reverse(root, 1, 4), 1, 4)
+        root, second = substring_hash(root, 3, 5)
+        self.assertEqual(first, second)
+        self.assertEqual(traverse(root), "abcabc")
+        self.assertEqual(find(root, ""), 0)
+        self.assertEqual(find(root, "abcabcd"), -1)
+        with self.assertRaises(ValueError):
+            substring_hash(root, 2, 6)
+
+    def test_hashes_are_opt_in(self) -> None:
+        """
+        Граничный случай.
+        Обычный узел не хранит хеш; хеши подстрок требуют rope из HashedNode, а find работает с любым.
+        """
+        self.assertNotIn("hash", Node.__slots__)
+        with self.assertRaises(AttributeError):
+            Node("a").hash = (0, 0)
+        root = build_rope("abcabc", block_size=4)
+        with self.assertRaises(TypeError):
+            substring_hash(root, 0, 2)
+        self.assertEqual(find(root, "cab"), 2)
+        # Разрез внутри блока создает узел того же вида, что и разрезаемый.
+        root = build_rope("abcabc", block_size=4, new_node=HashedNode)
+        root = rope_cut_and_paste(root, 1, 2, 4, block_size=4)
+        self.assertEqual(traverse(root), "aabcbc")
+        root, equal = substrings_equal(root, 1, 2, 2, 3, block_size=4)
+        self.assertFalse(equal)
+        root, equal = substrings_equal(root, 2, 3, 4, 5, block_size=4)
+        self.assertTrue(equal)
+        self.assertIsInstance(root, HashedNode)
+
+
+class TestRandomAccess(unittest.TestCase):
+    def test_random_against_naive(self) -> None:
+        """
+        Обычный случай.
+        char_at, substring и iter_range совпадают с индексацией и срезами обычной строки
+        после вырезаний и разворотов при любом размере блока.
+        """
+        rng = random.Random(19)
+        for _ in range(60):
+            n = rng.randrange(1, 40)
+            s = "".join(rng.choice("abcdefgh") for _ in range(n))
+            block_size = rng.choice((1, 2, 5))
+            root = build_rope(s, block_size=block_size)
+            for query in random_queries(n, 10, rng, reversals=0.5):
+                root = apply_query(root, query, block_size)
+                s = naive_apply(s, [query])
+                self.assertEqual([char_at(root, x) for x in range(n)], list(s))
+                i = rng.randrange(n)
+                j = rng.randrange(i, n)
+                self.assertEqual(substring(root, i, j), s[i:j + 1])
+                self.assertEqual("".join(iter_range(root, i, j)), s[i:j + 1])
+
+    def test_reads_are_local(self) -> None:
+        """
+        Граничный случай.
+        Итератор отрезка лениво читает только начало длинной строки; некорректные индексы.
+        """
+        root = build_rope("ab" * 100000)
+        chars = iter_range(root, 1, 199999)
+        self.assertEqual([next(chars) for _ in range(3)], ["b", "a", "b"])
+        self.assertEqual(substring(root, 199998, 199999), "ab")
+        with self.assertRaises(IndexError):
+            char_at(root, 200000)
+        with self.assertRaises(ValueError):
+            substring(root, 5, 4)
+        with self.assertRaises(IndexError):
+            char_at(None, 0)
+
+
+class TestRopeSession(unittest.TestCase):
+    def test_jobs_against_naive(self) -> None:
+        """
+        Обычный случай.
+        Сессия обрабатывает много документов на общих узлах и даёт те же результаты,
+        что и операции над строками; новых узлов создаётся не больше, чем в самом длинном документе.
+        """
+        rng = random.Random(20)
+        jobs = []
+        for _ in range(50):
+            n = rng.randrange(1, 40)
+            s = "".join(rng.choice("abc") for _ in range(n))
+            jobs.append((s, random_queries(n, rng.randrange(15), rng, reversals=0.3)))
+        for block_size in (1, 4):
+            with RopeSession(block_size=block_size) as session:
+                results = list(session.run_many(jobs))
+            self.assertEqual(results, [naive_apply(s, queries) for s, queries in jobs])
+        self.assertLessEqual(session.pool.created, 2 * max(len(s) for s, _ in jobs))
+
+    def test_pool_and_gc_settings(self) -> None:
+        """
+        Граничный случай.
+        Пул не хранит больше max_free узлов, узлы из пула чистые; настройки сборщика мусора
+        восстанавливаются после сессии, в том числе при ошибке в запросе.
+        """
+        pool = NodePool(max_free=3)
+        pool.release_tree(build_rope("abcdef"))
+        self.assertEqual(len(pool.free), 3)
+        node = pool.acquire("xy")
+        self.assertEqual((node.ch, node.size, node.left, node.parent, node.rev), ("xy", 2, None, None, False))
+
+        enabled, threshold = gc.isenabled(), gc.get_threshold()
+        with self.assertRaises(ValueError):
+            with RopeSession(gc_mode="tune", gc_threshold=(5000, 20, 20)) as session:
+                self.assertEqual(gc.get_threshold(), (5000, 20, 20))
+                session.run("abc", [(0, 5, 0)])
+        self.assertEqual((gc.isenabled(), gc.get_threshold()), (enabled, threshold))
+        with self.assertRaises(ValueError):
+            RopeSession(gc_mode="off")
+
+    def test_nodes_return_to_pool_on_error(self) -> None:
+        """
+        Граничный случай.
+        При отключенном сборщике мусора и ошибке в середине задания все узлы документа, включая хвосты
+        разрезанных блоков, возвращаются в пул, а новые узлы берутся только из пула.
+        """
+        for block_size in (1, 4):
+            with RopeSession(block_size=block_size) as session:
+                self.assertFalse(gc.isenabled())
+                for bad_query in ((0, 16, 0), (2, 6, 12), (3, 16), (1, 2, 3, 4)):
+                    with self.assertRaises(ValueError):
+                        session.run("abcdefghijklmnop", [(1, 6, 3), (5, 9), (2, 8, 7), bad_query])
+                    # Узел, созданный в обход пула, сделал бы свободных узлов больше, чем создано пулом.
+                    self.assertEqual(len(session.pool.free), session.pool.created)
+                # Следующий документ того же размера обходится узлами из пула.
+                created = session.pool.created
+                self.assertEqual(session.run("ponmlkjihgfedcba", [(1, 6, 3), (0, 15)]), naive_apply(
+                    "ponmlkjihgfedcba", [(1, 6, 3), (0, 15)]))
+                self.assertEqual(session.pool.created, created)
+                self.assertEqual(len(session.pool.free), created)
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_batch_in_order(self) -> None:
+        """
+        Обычный случай.
+        Пакетный запуск в одном процессе и в пуле процессов записывает те же результаты, что и
+        операции над строками, возвращает замеры в порядке заданий и не останавливается на ошибке.
+        """
+        rng = random.Random(21)
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs, expected = [], []
+            for index in range(12):
+                n = rng.randrange(1, 30)
+                s = "".join(rng.choice("abc") for _ in range(n))
+                queries = random_queries(n, rng.randrange(10), rng, reversals=0.3)
+                input_path = os.path.join(tmp, f"in{index}.txt")
+                with open(input_path, "w") as f:
+                    f.write(f"{s}\n{len(queries)}\n")
+                    f.writelines(" ".join(map(str, query)) + "\n" for query in queries)
+                jobs.append((input_path, os.path.join(tmp, f"out{index}.txt")))
+                expected.append(naive_apply(s, queries))
+            jobs.append((os.path.join(tmp, "missing.txt"), os.path.join(tmp, "missing_out.txt")))
+
+            for workers in (1, 2):
+                report = run_batch(jobs, workers=workers, chunk_size=5)
+                self.assertEqual([job.input_path for job in report.jobs], [path for path, _ in jobs])
+                self.assertEqual([job.input_path for job in report.failed], [jobs[-1][0]])
+                self.assertGreater(report.peak_memory, 0)
+                for (_, output_path), text in zip(jobs, expected):
+                    with open(output_path) as f:
+                        self.assertEqual(f.read(), text)
+        with self.assertRaises(ValueError):
+            run_batch([], chunk_size=0)
+
+    def test_failure_keeps_measurements(self) -> None:
+        """
+        Граничный случай.
+        Любое исключение задания записывается в его замеры вместе со временем и памятью до ошибки,
+        а следующие задания выполняются; вложенный замер не останавливает внешний tracemalloc.
+        """
+        def failing_job(input_path: str, output_path: str) -> None:
+            buffer = bytearray(1 << 20)
+            time.sleep(0.01)
+            if input_path == "bad":
+                raise RuntimeError(f"broken {len(buffer)}")
+
+        with mock.patch("lab2.batch.process_file", side_effect=failing_job):
+            report = run_batch([("bad", "out"), ("good", "out")], workers=1)
+        bad, good = report.jobs
+        self.assertEqual(bad.error, "RuntimeError: broken 1048576")
+        self.assertIsNone(good.error)
+        for job in (bad, good):
+            self.assertGreaterEqual(job.elapsed, 0.01)
+            self.assertGreaterEqual(job.peak_memory, 1 << 20)
+
+        tracemalloc.start()
+        try:
+            result, elapsed, peak = measure(lambda: len(bytearray(1 << 20)))
+            self.assertTrue(tracemalloc.is_tracing())
+            self.assertEqual(result, 1 << 20)
+            self.assertGreaterEqual(peak, 1 << 20)
+        finally:
+            tracemalloc.stop()
+        with self.assertRaises(KeyError):
+            measure({}.__getitem__, "missing")
+        self.assertFalse(tracemalloc.is_tracing())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+dsu.py
+
+Система непересекающихся множеств (DSU, union-find) на массивах array('i'):
+итеративный поиск представителя с делением пути пополам и объединение по размеру.
+Без рекурсии, поэтому глубокие деревья (вырожденные входы) не упираются в лимит рекурсии.
+"""
+
+from array import array
+from typing import Iterable, List
+
+
+class DisjointSetUnion:
+    """
+    DSU над элементами 0..n-1.
+
+    parent[i] – родитель элемента i (корень указывает сам на себя),
+    size[i] – размер множества с корнем i (имеет смысл только для корней).
+    """
+
+    __slots__ = ("parent", "size", "components")
+
+    def __init__(self, n_elements: int) -> None:
+        """
+        Создаёт n_elements одноэлементных множеств.
+
+        Args:
+            n_elements: Количество элементов.
+
+        Raises:
+            ValueError: Если n_elements отрицательно.
+        """
+        if n_elements < 0:
+            raise ValueError("Количество элементов не может быть отрицательным")
+        self.parent: array = array('i', range(n_elements))
+        self.size: array = array('i', [1]) * n_elements
+        # Текущее число множеств
+        self.components: int = n_elements
+
+    def __len__(self) -> int:
+        """Количество элементов."""
+        return len(self.parent)
+
+    def find(self, element: int) -> int:
+        """
+        Находит представителя множества элемента с делением пути пополам:
+        каждый пройденный узел переподвешивается к своему «деду».
+
+        Args:
+            element: Индекс элемента.
+
+        Returns:
+            Индекс корня множества.
+        """
+        parent = self.parent
+        while parent[element] != element:
+            grandparent = parent[parent[element]]
+            parent[element] = grandparent
+            element = grandparent
+        return element
+
+    def union(self, element_a: int, element_b: int) -> bool:
+        """
+        Объединяет множества двух элементов: меньшее подвешивается к большему.
+
+        Args:
+            element_a: Индекс первого элемента.
+            element_b: Индекс второго элемента.
+
+        Returns:
+            True, если множества были разными (объединение произошло).
+        """
+        # Поиск корней встроен в метод: union вызывается на каждом ребре Краскала
+        parent = self.parent
+        while parent[element_a] != element_a:
+            parent[element_a] = parent[parent[element_a]]
+            element_a = parent[element_a]
+        while parent[element_b] != element_b:
+            parent[element_b] = parent[parent[element_b]]
+            element_b = parent[element_b]
+        if element_a == element_b:
+            return False
+        size = self.size
+        if size[element_a] < size[element_b]:
+            element_a, element_b = element_b, element_a
+        parent[element_b] = element_a
+        size[element_a] += size[element_b]
+        self.components -= 1
+        return True
+
+    def connected(self, element_a: int, element_b: int) -> bool:
+        """Проверяет, лежат ли два элемента в одном множестве."""
+        return self.find(element_a) == self.find(element_b)
+
+    def find_many(self, elements: Iterable[int]) -> List[int]:
+        """
+        Находит представителей для последовательности элементов (например, массива индексов).
+
+        Args:
+            elements: Индексы элементов.
+
+        Returns:
+            Список корней в том же порядке.
+        """
+        find = self.find
+        return [find(element) for element in elements]
+
+    def union_many(self, firsts: Iterable[int], seconds: Iterable[int]) -> List[bool]:
+        """
+        Объединяет пары (firsts[t], seconds[t]) по порядку, как при последовательных вызовах union.
+
+        Args:
+            firsts: Первые элементы пар.
+            seconds: Вторые элементы пар (той же длины).
+
+        Returns:
+            Для каждой пары: True, если она соединила разные множества.
+        """
+        union = self.union
+        return [union(element_a, element_b) for element_a, element_b in zip(firsts, seconds)]
@@ -3,13 +3,22 @@
 mst_solver.py
 
 Задача: Построение минимального остовного дерева (MST) для заданных точек на плоскости.
-Алгоритм Краскала с использованием DSU.
+Алгоритм Краскала с использованием DSU – по всем парам точек (в том числе векторизованно на NumPy)
+или по рёбрам графа Яо (yao_graph.py),
+либо плотный алгоритм Прима за O(n²) без списка рёбер.
 Чтение из input.txt, запись в output.txt.
 """
 
 import math
-from typing import List, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 from utils import time_memory_decorator
+from dsu import DisjointSetUnion
+from yao_graph import yao_graph_edges
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен для стратегии "numpy" и ускоряет "prim".
+    np = None
 
 # Определяем тип для координат точки
 Point = Tuple[int, int]
@@ -20,6 +29,15 @@ Edge = Tuple[float, int, int]
 # Определяем тип для списка ребер
 EdgeList = List[Edge]
 
+# Доступные стратегии построения MST
+MST_STRATEGIES: Tuple[str, ...] = ("auto", "all_pairs", "numpy", "yao", "prim")
+# Сколько отсортированных рёбер стратегия "numpy" переводит из массивов в кортежи за раз
+NUMPY_EDGE_CHUNK: int = 1 << 16
+# Начиная с этого числа точек стратегия "auto" использует алгоритм Прима вместо всех пар.
+# Граф Яо "auto" не выбирает: на «полых» наборах точек его поиск соседей вырождается (см. yao_graph_edges),
+# а время Прима зависит только от n.
+PRIM_MIN_POINTS: int = 64
+
 
 # --- Вспомогательные функции ---
 
@@ -42,63 +60,18 @@ def calculate_distance(point1: Point, point2: Point) -> float:
     return math.sqrt(math.pow(delta_x, 2) + math.pow(delta_y, 2))
 
 
-# --- Основная функция для вычисления MST ---
-@time_memory_decorator
-def calculate_mst_length(points_coords: PointList) -> float:
+def all_pair_edges(points_coords: PointList) -> EdgeList:
     """
-    Вычисляет длину минимального остовного дерева (MST) для заданного списка точек
-    с использованием алгоритма Краскала и DSU.
+    Строит все n(n-1)/2 рёбер полного графа: O(n²) времени и памяти.
 
     Args:
         points_coords: Список кортежей с координатами точек [(x1, y1), ...].
 
     Returns:
-        Минимальная суммарная длина ребер MST (float).
-        Возвращает 0.0, если точек 0 или 1.
+        Список рёбер (вес, вершина1, вершина2).
     """
-    n_points: int = len(points_coords)
-    # Если точек мало (0 или 1), то длина MST равна 0
-    if n_points <= 1:
-        return 0.0
-
-    # --- Инициализация DSU (Система Непересекающихся Множеств) ---
-    # parent_nodes[i] хранит родителя i-го элемента (или сам элемент, если он корень)
-    parent_nodes: List[int] = list(range(n_points))
-    # node_ranks[i] хранит ранг дерева с корнем i (для оптимизации объединения)
-    node_ranks: List[int] = [0] * n_points
-
-    # --- Вспомогательные функции DSU (вложенные) ---
-    def find_set_representative(node_index: int) -> int:
-        """Находит представителя множества для node_index (со сжатием пути)."""
-        # Если узел - корень своего дерева
-        if node_index == parent_nodes[node_index]:
-            return node_index
-        # Рекурсивно ищем корень и переподвешиваем узел сразу к корню (сжатие пути)
-        parent_nodes[node_index] = find_set_representative(parent_nodes[node_index])
-        return parent_nodes[node_index]
-
-    def unite_sets(node_a_index: int, node_b_index: int) -> bool:
-        """Объединяет множества узлов node_a_index и node_b_index (по рангу)."""
-        # Находим корни деревьев для обоих узлов
-        root_a: int = find_set_representative(node_a_index)
-        root_b: int = find_set_representative(node_b_index)
-
-        # Если корни разные, множества можно объединить
-        if root_a != root_b:
-            # Объединение по рангу: дерево меньшего ранга присоединяется к дереву большего ранга
-            if node_ranks[root_a] < node_ranks[root_b]:
-                # Меняем корни местами, чтобы root_a всегда был корнем с большим/равным рангом
-                root_a, root_b = root_b, root_a
-            # Присоединяем дерево B к дереву A
-            parent_nodes[root_b] = root_a
-            # Если ранги были одинаковы, ранг нового корня (root_a) увеличивается
-            if node_ranks[root_a] == node_ranks[root_b]:
-                node_ranks[root_a] += 1
-            return True  # Объединение произошло
-        return False  # Узлы уже были в одном множестве
-
-    # --- Генерация всех возможных ребер ---
     all_edges: EdgeList = []
+    n_points: int = len(points_coords)
     # Перебираем все уникальные пары точек (i, j), где i < j
     for i in range(n_points):
         for j in range(i + 1, n_points):
@@ -106,22 +79,113 @@ def calculate_mst_length(points_coords: PointList) -> float:
             weight: float = calculate_distance(points_coords[i], points_coords[j])
             # Добавляем ребро в список в формате (вес, вершина1, вершина2)
             all_edges.append((weight, i, j))
+    return all_edges
 
-    # --- Сортировка ребер по весу (по возрастанию) ---
-    # Это ключевой шаг для жадного алгоритма Краскала
-    all_edges.sort()
+
+def numpy_pair_edges(points_coords: PointList) -> Iterator[Edge]:
+    """
+    Векторизованная замена all_pair_edges + sort: индексы верхнего треугольника
+    и квадраты расстояний считаются массивами, а рёбра упорядочиваются одним argsort.
+    Массивы заполняются по строкам треугольника (пары (i, i+1..n-1)), поэтому индексы
+    сразу создаются как int32, а больших промежуточных массивов разностей нет.
+    Квадрат расстояния упорядочивает рёбра так же, как само расстояние, поэтому корень
+    не извлекается вовсе – его берёт Краскал только для принятых рёбер. Для целых координат
+    (по модулю меньше 2^30) квадраты точны (int64), иначе считаются во float64.
+    Кортежи создаются частями по NUMPY_EDGE_CHUNK, так что после набора n - 1 рёбер
+    остальные не создаются.
+
+    Args:
+        points_coords: Список кортежей с координатами точек [(x1, y1), ...].
+
+    Yields:
+        Рёбра (квадрат длины, вершина1, вершина2) по возрастанию длины.
+
+    Raises:
+        ImportError: Если NumPy не установлен.
+    """
+    if np is None:
+        raise ImportError("NumPy is required for the 'numpy' strategy")
+    n_points: int = len(points_coords)
+    exact: bool = all(isinstance(c, int) and abs(c) < 2 ** 30 for point in points_coords for c in point)
+    dtype = np.int64 if exact else np.float64
+    xs = np.array([x for x, _ in points_coords], dtype=dtype)
+    ys = np.array([y for _, y in points_coords], dtype=dtype)
+
+    n_edges: int = n_points * (n_points - 1) // 2
+    first = np.empty(n_edges, dtype=np.int32)
+    second = np.empty(n_edges, dtype=np.int32)
+    squared = np.empty(n_edges, dtype=dtype)
+    targets = np.arange(n_points, dtype=np.int32)
+    start: int = 0
+    for i in range(n_points - 1):
+        end = start + n_points - 1 - i
+        first[start:end] = i
+        second[start:end] = targets[i + 1:]
+        delta_x = xs[i + 1:] - xs[i]
+        delta_y = ys[i + 1:] - ys[i]
+        squared[start:end] = delta_x * delta_x + delta_y * delta_y
+        start = end
+
+    order = np.argsort(squared, kind="stable")
+    for start in range(0, n_edges, NUMPY_EDGE_CHUNK):
+        chunk = order[start:start + NUMPY_EDGE_CHUNK]
+        yield from zip(squared[chunk].tolist(), first[chunk].tolist(), second[chunk].tolist())
+
+
+def yao_edges(points_coords: PointList) -> EdgeList:
+    """
+    Строит рёбра-кандидаты графа Яо (не больше 8n), среди которых есть все рёбра
+    некоторого MST. Совпадающие точки сначала склеиваются: они соединяются рёбрами
+    нулевой длины, а граф Яо строится по различным точкам.
+
+    Args:
+        points_coords: Список кортежей с координатами точек [(x1, y1), ...].
+
+    Returns:
+        Список рёбер (вес, вершина1, вершина2) с индексами исходного списка.
+    """
+    first_index = {}  # Точка -> индекс её первого вхождения
+    candidate_edges: EdgeList = []
+    for i, point in enumerate(points_coords):
+        j = first_index.setdefault(point, i)
+        if j != i:
+            candidate_edges.append((0.0, j, i))  # Повтор точки
+    unique: List[int] = list(first_index.values())
+    unique_points: PointList = [points_coords[i] for i in unique]
+    for a, b in yao_graph_edges(unique_points):
+        candidate_edges.append((calculate_distance(unique_points[a], unique_points[b]), unique[a], unique[b]))
+    return candidate_edges
+
+
+def kruskal_length(n_points: int, edges: Iterable[Edge],
+                   weight_of: Optional[Callable[[float], float]] = None) -> float:
+    """
+    Алгоритм Краскала: суммирует веса рёбер, которые соединяют разные компоненты.
+
+    Args:
+        n_points: Количество вершин.
+        edges: Рёбра (вес, вершина1, вершина2), отсортированные по возрастанию веса.
+        weight_of: Преобразование ключа сортировки в длину ребра, применяемое только к
+            принятым рёбрам (например, math.sqrt для квадратов длин); None – ключ и есть длина.
+
+    Returns:
+        Суммарная длина выбранных рёбер (длина MST, если граф рёбер связен).
+    """
+    # --- Инициализация DSU (Система Непересекающихся Множеств) ---
+    # Итеративный DSU на массивах (dsu.py): без рекурсии даже на вырожденных входах
+    union = DisjointSetUnion(n_points).union
 
     # --- Построение MST с помощью алгоритма Краскала ---
     minimum_total_length: float = 0.0
     edges_in_mst: int = 0  # Счетчик ребер, добавленных в MST
 
     # Идем по ребрам от самых легких к самым тяжелым
-    for edge_weight, u_node, v_node in all_edges:
+    for edge_weight, u_node, v_node in edges:
         # Пытаемся объединить множества, к которым принадлежат вершины ребра
-        # unite_sets вернет True, если вершины были в разных множествах (т.е. ребро не создает цикл)
-        if unite_sets(u_node, v_node):
+        # union вернет True, если вершины были в разных множествах (т.е. ребро не создает цикл)
+        if union(u_node, v_node):
             # Добавляем вес ребра к общей длине MST
-            minimum_total_length += edge_weight
+            minimum_total_length += edge_weight if weight_of is None else weight_of(edge_weight)
             # Увеличиваем счетчик добавленных ребер
             edges_in_mst += 1
             # Оптимизация: MST для N вершин всегда содержит N-1 ребро.
@@ -132,6 +196,111 @@ def calculate_mst_length(points_coords: PointList) -> float:
     return minimum_total_length
 
 
+def prim_length(points_coords: PointList) -> float:
+    """
+    Плотный алгоритм Прима: для каждой точки вне дерева хранится расстояние до дерева,
+    на каждом шаге в дерево добавляется ближайшая точка, и расстояния остальных точек
+    обновляются расстояниями до неё. O(n²) времени и O(n) памяти – рёбра не хранятся.
+    С NumPy шаг – один np.hypot по оставшимся точкам и argmin, без NumPy – цикл Python.
+
+    Args:
+        points_coords: Список кортежей с координатами точек [(x1, y1), ...].
+
+    Returns:
+        Длина MST (float).
+    """
+    n_points: int = len(points_coords)
+    if n_points <= 1:
+        return 0.0
+    start_x, start_y = points_coords[0]
+    minimum_total_length: float = 0.0
+
+    if np is not None:
+        # Оставшиеся точки занимают префикс [:remaining] массивов; добавленная в дерево точка
+        # заменяется последней, так что массивы не копируются и не сжимаются
+        xs = np.array([x for x, _ in points_coords[1:]], dtype=np.float64)
+        ys = np.array([y for _, y in points_coords[1:]], dtype=np.float64)
+        best = np.hypot(xs - start_x, ys - start_y)  # Расстояние от каждой точки до дерева
+        for remaining in range(n_points - 1, 0, -1):
+            k = int(best[:remaining].argmin())
+            minimum_total_length += float(best[k])
+            new_x, new_y = xs[k], ys[k]
+            last = remaining - 1
+            xs[k], ys[k], best[k] = xs[last], ys[last], best[last]
+            if last:
+                np.minimum(best[:last], np.hypot(xs[:last] - new_x, ys[:last] - new_y), out=best[:last])
+        return minimum_total_length
+
+    # --- Тот же алгоритм на списках (без NumPy) ---
+    rest: PointList = list(points_coords[1:])
+    best_distances: List[float] = [math.hypot(x - start_x, y - start_y) for x, y in rest]
+    while rest:
+        k = min(range(len(rest)), key=best_distances.__getitem__)
+        minimum_total_length += best_distances[k]
+        new_x, new_y = rest[k]
+        rest[k] = rest[-1]
+        best_distances[k] = best_distances[-1]
+        rest.pop()
+        best_distances.pop()
+        for index, (x, y) in enumerate(rest):
+            distance = math.hypot(x - new_x, y - new_y)
+            if distance < best_distances[index]:
+                best_distances[index] = distance
+    return minimum_total_length
+
+
+# --- Основная функция для вычисления MST ---
+@time_memory_decorator
+def calculate_mst_length(points_coords: PointList, strategy: str = "auto") -> float:
+    """
+    Вычисляет длину минимального остовного дерева (MST) для заданного списка точек
+    с использованием алгоритма Краскала и DSU (или алгоритма Прима).
+
+    Args:
+        points_coords: Список кортежей с координатами точек [(x1, y1), ...].
+        strategy: Откуда берутся рёбра для алгоритма Краскала:
+            "all_pairs" – все пары точек (O(n²) времени и памяти);
+            "numpy" – все пары точек, но рёбра строятся и сортируются массивами NumPy;
+            "yao" – граф Яо, O(n) рёбер (O(n log² n) времени и O(n) памяти на равномерных
+                и скученных наборах). Известное ограничение: на «полых» наборах (точки на
+                окружности) поиск соседей вырождается до O(n) узлов на точку, то есть O(n²)
+                в целом (20 000 точек на окружности – около 20 с), см. yao_graph_edges;
+            "prim" – плотный алгоритм Прима без списка рёбер (O(n²) времени, O(n) памяти);
+            "auto" – "prim" начиная с PRIM_MIN_POINTS точек, иначе "all_pairs". Граф Яо
+                нужно выбрать явно: время Прима не зависит от расположения точек.
+
+    Returns:
+        Минимальная суммарная длина ребер MST (float).
+        Возвращает 0.0, если точек 0 или 1.
+
+    Raises:
+        ValueError: Если стратегия неизвестна.
+        ImportError: Если выбрана стратегия "numpy", а NumPy не установлен.
+    """
+    if strategy not in MST_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия: {strategy!r}")
+    n_points: int = len(points_coords)
+    # Если точек мало (0 или 1), то длина MST равна 0
+    if n_points <= 1:
+        return 0.0
+    if strategy == "auto":
+        strategy = "prim" if n_points >= PRIM_MIN_POINTS else "all_pairs"
+    if strategy == "prim":
+        return prim_length(points_coords)
+    if strategy == "numpy":
+        # Рёбра уже упорядочены по квадрату длины: корень извлекается только для рёбер MST
+        return kruskal_length(n_points, numpy_pair_edges(points_coords), math.sqrt)
+
+    # --- Генерация ребер ---
+    all_edges: EdgeList = yao_edges(points_coords) if strategy == "yao" else all_pair_edges(points_coords)
+
+    # --- Сортировка ребер по весу (по возрастанию) ---
+    # Это ключевой шаг для жадного алгоритма Краскала
+    all_edges.sort()
+
+    return kruskal_length(n_points, all_edges)
+
+
 # --- Точка входа при запуске скрипта ---
 if __name__ == "__main__":
     # Используем 'with' для автоматического и безопасного закрытия файлов
@@ -8,8 +8,13 @@ tests.py
 
 import unittest
 import math
+import random
+from unittest import mock
 # Импортируем функции из нашего основного файла
+import mst_solver
 from mst_solver import calculate_distance, calculate_mst_length
+from yao_graph import box_cones, cone_index, yao_graph_edges
+from dsu import DisjointSetUnion
 
 
 class TestMSTCalculation(unittest.TestCase):
@@ -115,6 +120,172 @@ class TestMSTCalculation(unittest.TestCase):
         self.assertAlmostEqual(calculate_mst_length(points), expected_length, places=9)
 
 
+class TestYaoStrategy(unittest.TestCase):
+    """Набор тестов для стратегии на графе Яо."""
+
+    def test_cone_index(self):
+        """Тест: Номера конусов по 45° для векторов разных направлений."""
+        directions = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+        self.assertEqual([cone_index(dx, dy) for dx, dy in directions], list(range(8)))
+
+    def test_yao_matches_all_pairs(self):
+        """Тест: Граф Яо даёт ту же длину MST, что и все пары, на случайных наборах точек."""
+        rng = random.Random(22)
+        for trial in range(60):
+            n = rng.randrange(2, 70)
+            spread = rng.choice((3, 50, 1000))
+            points = [(rng.randint(-spread, spread), rng.randint(-spread, spread)) for _ in range(n)]
+            if trial % 4 == 0:
+                points = [(rng.randint(0, 100), 7) for _ in range(n)]  # Точки на одной прямой
+            self.assertAlmostEqual(calculate_mst_length(points, strategy="yao"),
+                                   calculate_mst_length(points, strategy="all_pairs"), places=7)
+
+    def test_yao_edges_linear(self):
+        """Тест: Рёбер графа Яо не больше 8n."""
+        rng = random.Random(7)
+        points = list({(rng.randint(0, 10000), rng.randint(0, 10000)) for _ in range(2000)})
+        self.assertLessEqual(len(yao_graph_edges(points)), 8 * len(points))
+
+    def test_box_cones(self):
+        """Тест: box_cones по углам прямоугольника находит все конусы, которые он задевает."""
+        rng = random.Random(22)
+        for _ in range(300):
+            x0, y0 = rng.randint(-6, 6), rng.randint(-6, 6)
+            x1, y1 = x0 + rng.randint(0, 6), y0 + rng.randint(0, 6)
+            if x0 <= 0 <= x1 and y0 <= 0 <= y1:
+                continue  # Прямоугольник содержит точку (0, 0)
+            corners = {cone_index(x, y) for x in (x0, x1) for y in (y0, y1)}
+            met = {cone_index(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)}
+            self.assertLessEqual(met, set(box_cones(corners)))
+
+    def test_yao_clustered_with_outliers(self):
+        """Тест: Плотное скопление с далекими выбросами (худший случай равномерной сетки)."""
+        rng = random.Random(5)
+        points = [(rng.randint(-30, 30), rng.randint(-30, 30)) for _ in range(600)]
+        points += [(rng.randint(-10 ** 6, 10 ** 6), rng.randint(-10 ** 6, 10 ** 6)) for _ in range(5)]
+        self.assertAlmostEqual(calculate_mst_length(points, strategy="yao"),
+                               calculate_mst_length(points, strategy="prim"), places=5)
+
+    def test_yao_duplicates_and_errors(self):
+        """Тест: Совпадающие точки соединяются рёбрами нулевой длины; неизвестная стратегия."""
+        points = [(0, 0), (0, 0), (3, 4), (3, 4), (0, 0)]
+        self.assertAlmostEqual(calculate_mst_length(points, strategy="yao"), 5.0, places=9)
+        with self.assertRaises(ValueError):
+            calculate_mst_length(points, strategy="delaunay")
+
+
+class TestPrimStrategy(unittest.TestCase):
+    """Тесты плотного алгоритма Прима (с NumPy и без него)."""
+
+    def check_prim(self):
+        """Сравнивает "prim" с "all_pairs" на случайных наборах и крайних случаях."""
+        rng = random.Random(23)
+        for trial in range(40):
+            n = rng.randint(2, 60)
+            points = [(rng.randint(-1000, 999), rng.randint(-1000, 999)) for _ in range(n)]
+            self.assertAlmostEqual(calculate_mst_length(points, strategy="prim"),
+                                   calculate_mst_length(points, strategy="all_pairs"), places=6)
+        self.assertEqual(calculate_mst_length([], strategy="prim"), 0.0)
+        self.assertEqual(calculate_mst_length([(5, 5)], strategy="prim"), 0.0)
+        self.assertAlmostEqual(calculate_mst_length([(0, 0), (0, 0), (3, 4)], strategy="prim"), 5.0, places=9)
+
+    @unittest.skipIf(mst_solver.np is None, "NumPy не установлен")
+    def test_prim_numpy(self):
+        """Тест: Прим на NumPy совпадает с Краскалом по всем парам."""
+        self.check_prim()
+
+    def test_prim_pure_python(self):
+        """Тест: Прим без NumPy совпадает с Краскалом по всем парам."""
+        with mock.patch.object(mst_solver, "np", None):
+            self.check_prim()
+
+    def test_auto_strategy_choice(self):
+        """Тест: "auto" выбирает Прима начиная с PRIM_MIN_POINTS точек и никогда не строит граф Яо."""
+        threshold = mst_solver.PRIM_MIN_POINTS
+        # Точки на окружности – худший случай графа Яо.
+        angles = [2 * math.pi * k / threshold for k in range(threshold)]
+        circle = [(round(1000 * math.cos(angle)), round(1000 * math.sin(angle))) for angle in angles]
+        with mock.patch.object(mst_solver, "yao_edges", side_effect=AssertionError("yao is opt-in")), \
+                mock.patch.object(mst_solver, "prim_length", wraps=mst_solver.prim_length) as prim:
+            expected = calculate_mst_length(circle, strategy="all_pairs")
+            self.assertAlmostEqual(calculate_mst_length(circle), expected, places=6)
+            prim.assert_called_once_with(circle)
+            calculate_mst_length(circle[:threshold - 1])
+            prim.assert_called_once()  # Меньше порога – все пары.
+
+
+class TestNumpyPairsStrategy(unittest.TestCase):
+    """Тесты векторизованного построения и сортировки рёбер."""
+
+    @unittest.skipIf(mst_solver.np is None, "NumPy не установлен")
+    def test_numpy_matches_all_pairs(self):
+        """Тест: Стратегия "numpy" совпадает с "all_pairs", в том числе при нескольких частях рёбер."""
+        rng = random.Random(24)
+        with mock.patch.object(mst_solver, "NUMPY_EDGE_CHUNK", 7):
+            for trial in range(40):
+                n = rng.randint(2, 60)
+                points = [(rng.randint(-1000, 999), rng.randint(-1000, 999)) for _ in range(n)]
+                self.assertAlmostEqual(calculate_mst_length(points, strategy="numpy"),
+                                       calculate_mst_length(points, strategy="all_pairs"), places=6)
+        self.assertAlmostEqual(calculate_mst_length([(0, 0), (0, 0), (3, 4)], strategy="numpy"), 5.0, places=9)
+        self.assertAlmostEqual(calculate_mst_length([(-10**6, -10**6), (10**6, 10**6)], strategy="numpy"),
+                               2 * math.sqrt(2) * 10**6, places=6)
+
+    @unittest.skipIf(mst_solver.np is None, "NumPy не установлен")
+    def test_numpy_non_integer_and_huge(self):
+        """Тест: Дробные и очень большие координаты не обрезаются до целых и не переполняются."""
+        points = [(0.5, 0.5), (0.5, 1.25), (2.0, 1.25)]
+        self.assertAlmostEqual(calculate_mst_length(points, strategy="numpy"), 2.25, places=9)
+        points = [(-4 * 10 ** 9, 0), (4 * 10 ** 9, 0), (4 * 10 ** 9, 3 * 10 ** 9)]
+        self.assertAlmostEqual(calculate_mst_length(points, strategy="numpy"), 1.1e10, delta=1e-3)
+        edges = list(mst_solver.numpy_pair_edges([(0, 0), (3, 4), (1, 1)]))
+        self.assertEqual(edges, [(2, 0, 2), (13, 1, 2), (25, 0, 1)])
+        self.assertTrue(all(type(value) is int for edge in edges for value in edge))
+
+    def test_numpy_missing(self):
+        """Тест: Без NumPy стратегия "numpy" сообщает об этом явно."""
+        with mock.patch.object(mst_solver, "np", None):
+            with self.assertRaises(ImportError):
+                calculate_mst_length([(0, 0), (1, 1)], strategy="numpy")
+
+
+class TestDisjointSetUnion(unittest.TestCase):
+    """Тесты итеративного DSU на массивах."""
+
+    def test_dsu_matches_naive(self):
+        """Тест: Случайные объединения совпадают с наивной разметкой компонент."""
+        rng = random.Random(25)
+        n = 200
+        dsu = DisjointSetUnion(n)
+        labels = list(range(n))  # Наивно: метка компоненты у каждого элемента
+        for _ in range(300):
+            a, b = rng.randrange(n), rng.randrange(n)
+            merged = labels[a] != labels[b]
+            self.assertEqual(dsu.union(a, b), merged)
+            if merged:
+                old = labels[b]
+                labels = [labels[a] if label == old else label for label in labels]
+            c, d = rng.randrange(n), rng.randrange(n)
+            self.assertEqual(dsu.connected(c, d), labels[c] == labels[d])
+        self.assertEqual(dsu.components, len(set(labels)))
+        self.assertEqual(len(dsu), n)
+
+    def test_dsu_batched_and_deep(self):
+        """Тест: find_many/union_many и длинная цепочка без рекурсии."""
+        n = 100000
+        dsu = DisjointSetUnion(n)
+        # Цепочка из попарных объединений: каждое присоединяет новый элемент
+        self.assertEqual(dsu.union_many(range(1, n), range(n - 1)), [True] * (n - 1))
+        self.assertEqual(dsu.components, 1)
+        self.assertEqual(len(set(dsu.find_many(range(0, n, 997)))), 1)
+        self.assertEqual(dsu.union_many([0, 5], [n - 1, 7]), [False, False])
+        # MST цепочки точек на прямой – глубокий вход для Краскала
+        points = [(x, 0) for x in range(400)]
+        self.assertAlmostEqual(calculate_mst_length(points, strategy="all_pairs"), 399.0, places=9)
+        with self.assertRaises(ValueError):
+            DisjointSetUnion(-1)
+
+
 # --- Запуск тестов ---
 if __name__ == '__main__':
     # Запускаем все тесты в этом модуле
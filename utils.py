@@ -3,19 +3,52 @@ import tracemalloc
 import functools
 
 
-def time_memory_decorator(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
+def measure_outcome(func, *args, **kwargs):
+    """
+    Вызывает func(*args, **kwargs), ничего не печатая, и возвращает четвёрку
+    (результат, исключение, время выполнения в секундах, пиковое использование памяти в байтах).
+    Если func выбросила Exception, оно не пробрасывается, а возвращается вместе с замерами до момента
+    ошибки (результат тогда None); иначе исключение – None.
+    Если tracemalloc уже запущен (вложенный замер), он не перезапускается и не останавливается: пик
+    считается от памяти на момент вызова и может оказаться завышенным, если внешний пик был выше.
+    """
+    nested = tracemalloc.is_tracing()
+    if nested:
+        baseline, _ = tracemalloc.get_traced_memory()
+    else:
         tracemalloc.start()  # запускаем мониторинг памяти
-        start_time = time.perf_counter()  # запоминаем время старта
+        baseline = 0
+    start_time = time.perf_counter()  # запоминаем время старта
+    try:
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as exc:
+            result, error = None, exc
+    finally:
+        elapsed_time = time.perf_counter() - start_time  # время выполнения
+        _, peak = tracemalloc.get_traced_memory()  # пиковое использование памяти
+        if not nested:
+            tracemalloc.stop()  # останавливаем мониторинг памяти
+    return result, error, elapsed_time, max(peak - baseline, 0)
+
 
-        result = func(*args, **kwargs)
+def measure(func, *args, **kwargs):
+    """
+    Вызывает func(*args, **kwargs), ничего не печатая, и возвращает тройку
+    (результат, время выполнения в секундах, пиковое использование памяти в байтах).
+    Удобно, когда замеры нужно собрать и сложить, например в процессах пакетной обработки.
+    Исключение func пробрасывается; вложенные замеры допустимы (см. measure_outcome).
+    """
+    result, error, elapsed_time, peak = measure_outcome(func, *args, **kwargs)
+    if error is not None:
+        raise error
+    return result, elapsed_time, peak
 
-        end_time = time.perf_counter()  # время завершения
-        current, peak = tracemalloc.get_traced_memory()  # получаем текущее и пиковое использование памяти
-        tracemalloc.stop()  # останавливаем мониторинг памяти
 
-        elapsed_time = end_time - start_time
+def time_memory_decorator(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result, elapsed_time, peak = measure(func, *args, **kwargs)
         print(f"Время выполнения функции {func.__name__}: {elapsed_time:.6f} секунд")
         print(f"Пиковое использование памяти: {peak / 1024:.2f} КБ")
         return result